@@ -0,0 +1,83 @@
+"""Moves delivered and cancelled orders out of the hot order tables.
+
+Run from the same image, e.g. nightly:
+
+    python archive_orders.py
+
+Orders in ORDER_ARCHIVE_STATUSES that have not changed for
+ORDER_ARCHIVE_AFTER_DAYS are copied with their items to order_archive and
+order_item_archive and deleted from order and order_item, one batch of
+ORDER_ARCHIVE_BATCH_SIZE orders per transaction. Ids are kept, so get_order
+and the listing endpoints read both tables without clients noticing; the
+order summaries are unaffected. With ORDER_ARCHIVE_INTERVAL set, the job
+keeps running and archives again every that many seconds.
+"""
+import datetime
+import logging
+import os
+import time
+
+from app import app, db, ArchivedOrder, ArchivedOrderItem, Order, OrderItem, ORDER_ARCHIVE_STATUSES
+
+logger = logging.getLogger('archive_orders')
+
+ORDER_ARCHIVE_AFTER_DAYS = float(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '30'))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.environ.get('ORDER_ARCHIVE_BATCH_SIZE', '1000'))
+# Seconds between runs; 0 archives once and exits
+ORDER_ARCHIVE_INTERVAL = float(os.environ.get('ORDER_ARCHIVE_INTERVAL', '0'))
+
+ORDER_COLUMNS = [column.key for column in Order.__table__.columns]
+ORDER_ITEM_COLUMNS = [column.key for column in OrderItem.__table__.columns]
+
+
+def archive_batch(cutoff, batch_size=ORDER_ARCHIVE_BATCH_SIZE):
+    """Archive up to batch_size eligible orders. Returns how many were moved."""
+    # Rows locked by an in-flight write are left for the next batch
+    order_ids = [row.id for row in Order.query.with_entities(Order.id)
+                 .filter(Order.status.in_(ORDER_ARCHIVE_STATUSES), Order.updated_at < cutoff)
+                 .order_by(Order.id)
+                 .limit(batch_size)
+                 .with_for_update(skip_locked=True)]
+    if not order_ids:
+        db.session.commit()
+        return 0
+
+    now = datetime.datetime.utcnow()
+    db.session.execute(db.insert(ArchivedOrder).from_select(
+        ORDER_COLUMNS + ['archived_at'],
+        db.select(*[getattr(Order, name) for name in ORDER_COLUMNS], db.literal(now, db.DateTime))
+        .where(Order.id.in_(order_ids)),
+    ))
+    db.session.execute(db.insert(ArchivedOrderItem).from_select(
+        ORDER_ITEM_COLUMNS,
+        db.select(*[getattr(OrderItem, name) for name in ORDER_ITEM_COLUMNS]).where(OrderItem.order_id.in_(order_ids)),
+    ))
+    db.session.execute(db.delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+    db.session.execute(db.delete(Order).where(Order.id.in_(order_ids)))
+    db.session.commit()
+    return len(order_ids)
+
+
+def archive_orders(after_days=ORDER_ARCHIVE_AFTER_DAYS, batch_size=ORDER_ARCHIVE_BATCH_SIZE):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=after_days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def run():
+    with app.app_context():
+        while True:
+            start = time.monotonic()
+            archived = archive_orders()
+            logger.info("Archived %s orders in %.1fs", archived, time.monotonic() - start)
+            if not ORDER_ARCHIVE_INTERVAL:
+                return
+            time.sleep(ORDER_ARCHIVE_INTERVAL)
+
+
+if __name__ == '__main__':
+    run()
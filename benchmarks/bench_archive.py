@@ -0,0 +1,110 @@
+"""Hot-path latency as the order history grows, with and without archiving.
+
+Seeds a fixed set of active orders plus a growing history of delivered and
+cancelled ones, times the hot-path routes with everything in the order
+table, then runs archive_orders and times them again.
+
+    python -m benchmarks.bench_archive --history 1000,10000,100000
+"""
+import argparse
+import datetime
+import time
+
+from benchmarks.common import auth_header, configure_env, summarize
+from benchmarks.stubs import start_inventory_stub
+
+
+def seed(order_app, active, history, users):
+    db = order_app.db
+    for model in (order_app.ArchivedOrderItem, order_app.ArchivedOrder, order_app.OrderItem, order_app.Order):
+        db.session.query(model).delete()
+    now = datetime.datetime.utcnow()
+    old = now - datetime.timedelta(days=90)
+
+    def order(i, status, created_at, updated_at):
+        return {
+            'user_id': str(i % users + 1),
+            'total_amount': 30.0,
+            'status': status,
+            'payment_status': 'paid',
+            'shipping_name': 'Bench User',
+            'shipping_address1': '1 Bench Road',
+            'shipping_city': 'Dhaka',
+            'shipping_state': 'Dhaka',
+            'shipping_postal_code': '1200',
+            'shipping_country': 'BD',
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+
+    for start in range(0, history, 10000):
+        db.session.execute(db.insert(order_app.Order), [
+            order(i, ('delivered', 'cancelled')[i % 2], old - datetime.timedelta(seconds=i), old)
+            for i in range(start, min(start + 10000, history))
+        ])
+    db.session.execute(db.insert(order_app.Order), [
+        order(i, 'pending', now - datetime.timedelta(seconds=i), now) for i in range(active)
+    ])
+    order_ids = [row.id for row in db.session.query(order_app.Order.id)]
+    for start in range(0, len(order_ids), 10000):
+        db.session.execute(db.insert(order_app.OrderItem), [
+            {'order_id': order_id, 'product_id': order_id % 200 + 1, 'name': 'Product', 'price': 30.0, 'quantity': 1}
+            for order_id in order_ids[start:start + 10000]
+        ])
+    db.session.commit()
+    return max(order_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--history', default='1000,10000,100000', help='archivable orders per run')
+    parser.add_argument('--active', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    import archive_orders
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    admin = auth_header(order_app.JWT_SECRET_KEY, 1, is_staff=True)
+    user = auth_header(order_app.JWT_SECRET_KEY, 1)
+
+    def timed(request):
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = request()
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return summarize(samples)['p50_ms']
+
+    print(f"{'history':>8} {'tables':>9} {'pending pg':>11} {'admin pg':>9} {'my-orders':>10} "
+          f"{'get':>6} {'status':>7}   (p50 ms)")
+    for history in [int(size) for size in args.history.split(',')]:
+        with order_app.app.app_context():
+            active_id = seed(order_app, args.active, history, args.users)
+        for label in ('hot only', 'archived'):
+            if label == 'archived':
+                with order_app.app.app_context():
+                    moved = archive_orders.archive_orders(after_days=30)
+                    assert moved == history, moved
+            routes = [
+                lambda: client.get('/order-api/orders?status=pending&limit=50', headers=admin),
+                lambda: client.get('/order-api/orders?limit=50', headers=admin),
+                lambda: client.get('/order-api/my-orders?limit=50', headers=user),
+                lambda: client.get(f"/order-api/orders/{active_id}", headers=admin),
+                lambda: client.put(f"/order-api/internal/orders/{active_id}/status", json={'trackingNumber': 'T1'}),
+            ]
+            results = [timed(route) for route in routes]
+            print(f"{history:>8} {label:>9} {results[0]:>11.2f} {results[1]:>9.2f} {results[2]:>10.2f} "
+                  f"{results[3]:>6.2f} {results[4]:>7.2f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
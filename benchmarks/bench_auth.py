@@ -0,0 +1,64 @@
+"""Auth overhead per request: decode per call (old) vs decode once + verified-token cache.
+
+The old path is what get_order used to do: token_required decoded the JWT,
+then get_user_from_token() decoded it twice more, logging each time.
+
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import logging
+import time
+
+import jwt
+
+from benchmarks.common import auth_header, configure_env
+from benchmarks.stubs import start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+    token = headers['Authorization'].split(' ')[1]
+
+    def old_path():
+        for _ in range(3):
+            payload = jwt.decode(token, order_app.JWT_SECRET_KEY, algorithms=['HS256'])
+            user_info = {'is_staff': payload.get('is_staff'), 'user_id': payload.get('user_id')}
+            order_app.app.logger.info(f"User info from token: {user_info}")
+
+    @order_app.token_required
+    def new_path():
+        order_app.get_user_from_token()
+        order_app.get_user_from_token()
+
+    print(f"{'path':<32} {'us/request':>10}")
+    for label, path in (('decode per call (old)', old_path), ('decode once + cache', new_path)):
+        with order_app.app.test_request_context(headers=headers):
+            path()  # warm up
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            with order_app.app.test_request_context(headers=headers):
+                path()
+        per_request = (time.perf_counter() - start) / args.iterations
+        print(f"{label:<32} {per_request * 1e6:>10.1f}")
+
+    # Baseline cost of the request context itself, included in both rows above
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        with order_app.app.test_request_context(headers=headers):
+            pass
+    print(f"{'(request context only)':<32} {(time.perf_counter() - start) / args.iterations * 1e6:>10.1f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    logging.disable(logging.CRITICAL)
+    main()
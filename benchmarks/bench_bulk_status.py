@@ -0,0 +1,52 @@
+"""Reconciling N orders: one PUT per order vs one bulk POST.
+
+    python -m benchmarks.bench_bulk_status --orders 1000
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from benchmarks.bench_listing_queries import seed_orders
+from benchmarks.common import configure_env
+from benchmarks.stubs import start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1000)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+
+    statements = []
+    with order_app.app.app_context():
+        event.listen(order_app.db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    print(f"{'mode':<10} {'orders':>7} {'queries':>8} {'seconds':>8}")
+    for mode in ('per-order', 'bulk'):
+        with order_app.app.app_context():
+            seed_orders(order_app, args.orders)
+            order_ids = [row.id for row in order_app.db.session.query(order_app.Order.id)]
+        updates = [{'orderId': order_id, 'status': 'confirm', 'trackingNumber': f"TRK{order_id}"} for order_id in order_ids]
+        statements.clear()
+        start = time.perf_counter()
+        if mode == 'per-order':
+            for update in updates:
+                response = client.put(f"/order-api/internal/orders/{update['orderId']}/status", json=update)
+                assert response.status_code == 200
+        else:
+            response = client.post('/order-api/internal/orders/status', json=updates)
+            assert all(result['success'] for result in response.get_json()['results'])
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<10} {len(updates):>7} {len(statements):>8} {elapsed:>8.2f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""p50/p99 latency of POST /order-api/orders against cart size.
+
+    python -m benchmarks.bench_create_order --latency 0.02 --requests 50
+"""
+import argparse
+import time
+
+from benchmarks.common import auth_header, configure_env, shipping_address, summarize
+from benchmarks.stubs import start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.02, help='stub inventory latency in seconds')
+    parser.add_argument('--requests', type=int, default=30, help='orders per cart size')
+    parser.add_argument('--cart-sizes', default='1,5,10,20,50')
+    parser.add_argument('--warm-cache', action='store_true', help='keep the product cache between orders')
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub(latency=args.latency)
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+
+    print(f"inventory latency {args.latency * 1000:.0f} ms")
+    print(f"{'cart':>5} {'p50 ms':>9} {'p99 ms':>9} {'inv calls/order':>16}")
+    for cart_size in [int(size) for size in args.cart_sizes.split(',')]:
+        payload = {
+            'items': [{'productId': i + 1, 'quantity': 1} for i in range(cart_size)],
+            'shippingAddress': shipping_address(),
+        }
+        samples = []
+        calls_before = server.calls
+        for _ in range(args.requests):
+            if not args.warm_cache:
+                order_app.product_cache.invalidate()
+            start = time.perf_counter()
+            response = client.post('/order-api/orders', json=payload, headers=headers)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.get_data(as_text=True)
+        stats = summarize(samples)
+        calls = (server.calls - calls_before) / args.requests
+        print(f"{cart_size:>5} {stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f} {calls:>16.1f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Peak Python memory while streaming the admin order export.
+
+Seeds the orders in batches, then consumes /order-api/orders?format=ndjson
+under tracemalloc. Exits non-zero if the peak exceeds --ceiling-mb, or if
+the export is missing orders.
+
+    python -m benchmarks.bench_export_memory --orders 1000000 --ceiling-mb 64
+"""
+import argparse
+import datetime
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import auth_header, configure_env
+from benchmarks.stubs import start_inventory_stub
+
+
+def seed_orders_batched(order_app, count, items_per_order=3, batch_size=20000):
+    db, Order, OrderItem = order_app.db, order_app.Order, order_app.OrderItem
+    db.session.query(OrderItem).delete()
+    db.session.query(Order).delete()
+    now = datetime.datetime.utcnow()
+    for start in range(0, count, batch_size):
+        orders = [{
+            'id': i + 1,
+            'user_id': str(i % 1000 + 1),
+            'total_amount': 30.0,
+            'status': 'pending',
+            'payment_status': 'pending',
+            'shipping_name': 'Bench User',
+            'shipping_address1': '1 Bench Road',
+            'shipping_city': 'Dhaka',
+            'shipping_state': 'Dhaka',
+            'shipping_postal_code': '1200',
+            'shipping_country': 'BD',
+            'created_at': now - datetime.timedelta(seconds=i),
+            'updated_at': now,
+        } for i in range(start, min(start + batch_size, count))]
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), [{
+            'order_id': order['id'],
+            'product_id': (order['id'] + i) % 200 + 1,
+            'name': 'Product',
+            'price': 10.0,
+            'quantity': 1,
+        } for order in orders for i in range(items_per_order)])
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--ceiling-mb', type=float, default=64)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1, is_staff=True)
+
+    with order_app.app.app_context():
+        seed_orders_batched(order_app, args.orders)
+    client.get('/order-api/orders', headers=headers)  # warm the product cache
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get('/order-api/orders?format=ndjson', headers=headers, buffered=False)
+    lines = size = 0
+    for chunk in response.response:
+        lines += chunk.count(b'\n')
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    peak_mb = peak / (1 << 20)
+    print(f"orders={args.orders} streamed={lines} bytes={size} seconds={elapsed:.1f} peak_mb={peak_mb:.1f}")
+    if lines != args.orders:
+        sys.exit(f"Export returned {lines} orders, expected {args.orders}")
+    if peak_mb > args.ceiling_mb:
+        sys.exit(f"Peak memory {peak_mb:.1f} MB exceeds the {args.ceiling_mb} MB ceiling")
+
+
+if __name__ == '__main__':
+    main()
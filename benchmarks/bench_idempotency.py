@@ -0,0 +1,95 @@
+"""Replayed and concurrent duplicate POST /order-api/orders with an Idempotency-Key.
+
+    python -m benchmarks.bench_idempotency --latency 0.05 --requests 50 --concurrency 16
+
+Reports first-request vs replay latency, how many inventory calls the
+replays made (should be 0), and how many orders a burst of concurrent
+duplicates created (should be 1).
+"""
+import argparse
+import threading
+import time
+import uuid
+
+from benchmarks.common import auth_header, configure_env, shipping_address, summarize
+from benchmarks.stubs import start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05, help='stub inventory latency in seconds')
+    parser.add_argument('--requests', type=int, default=30, help='keys created and replayed')
+    parser.add_argument('--cart-size', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous duplicates of one key')
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub(latency=args.latency)
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+    payload = {
+        'items': [{'productId': i + 1, 'quantity': 1} for i in range(args.cart_size)],
+        'shippingAddress': shipping_address(),
+    }
+
+    first, replay = [], []
+    calls_before = server.calls
+    for _ in range(args.requests):
+        order_app.product_cache.invalidate()
+        key_headers = dict(headers, **{'Idempotency-Key': str(uuid.uuid4())})
+        start = time.perf_counter()
+        response = client.post('/order-api/orders', json=payload, headers=key_headers)
+        first.append(time.perf_counter() - start)
+        assert response.status_code == 201, response.get_data(as_text=True)
+
+        order_app.product_cache.invalidate()
+        replay_calls = server.calls
+        start = time.perf_counter()
+        again = client.post('/order-api/orders', json=payload, headers=key_headers)
+        replay.append(time.perf_counter() - start)
+        assert again.headers.get('Idempotent-Replayed') == 'true'
+        assert again.get_data() == response.get_data()
+        assert server.calls == replay_calls, 'replay called inventory'
+    first_calls = (server.calls - calls_before) / args.requests
+
+    print(f"inventory latency {args.latency * 1000:.0f} ms, cart {args.cart_size}")
+    print(f"{'request':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, samples in (('first', first), ('replay', replay)):
+        stats = summarize(samples)
+        print(f"{name:>8} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(f"inventory calls: {first_calls:.1f} per first request, 0 per replay")
+
+    order_app.product_cache.invalidate()
+    user_id = 2
+    burst_headers = dict(auth_header(order_app.JWT_SECRET_KEY, user_id), **{'Idempotency-Key': str(uuid.uuid4())})
+    barrier = threading.Barrier(args.concurrency)
+    results = []
+
+    def duplicate():
+        barrier.wait()
+        response = order_app.app.test_client().post('/order-api/orders', json=payload, headers=burst_headers)
+        results.append((response.status_code, response.headers.get('Idempotent-Replayed'), response.get_json().get('id')))
+
+    threads = [threading.Thread(target=duplicate) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with order_app.app.app_context():
+        orders = order_app.Order.query.filter_by(user_id=str(user_id)).count()
+    replayed = sum(1 for _, flag, _ in results if flag == 'true')
+    print(f"{args.concurrency} concurrent duplicates in {elapsed * 1000:.0f} ms: "
+          f"{orders} order(s) created, {replayed} replayed, "
+          f"statuses {sorted({status for status, _, _ in results})}, ids {sorted({order_id for _, _, order_id in results})}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""SQL statements and latency per listing page as the order count grows.
+
+Exits non-zero if the number of queries is not the same for every size.
+
+    python -m benchmarks.bench_listing_queries --sizes 10,1000,10000
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import auth_header, configure_env
+from benchmarks.stubs import start_inventory_stub
+
+
+def seed_orders(order_app, count, users=1, items_per_order=3, statuses=('pending',)):
+    db, Order, OrderItem = order_app.db, order_app.Order, order_app.OrderItem
+    db.session.query(OrderItem).delete()
+    db.session.query(Order).delete()
+    now = datetime.datetime.utcnow()
+    orders = [{
+        'user_id': str(i % users + 1),
+        'total_amount': 30.0,
+        'status': statuses[i % len(statuses)],
+        'payment_status': 'pending',
+        'shipping_name': 'Bench User',
+        'shipping_address1': '1 Bench Road',
+        'shipping_city': 'Dhaka',
+        'shipping_state': 'Dhaka',
+        'shipping_postal_code': '1200',
+        'shipping_country': 'BD',
+        'created_at': now - datetime.timedelta(seconds=i),
+        'updated_at': now,
+    } for i in range(count)]
+    db.session.execute(db.insert(Order), orders)
+    order_ids = [row.id for row in db.session.query(Order.id)]
+    items = [{
+        'order_id': order_id,
+        'product_id': (order_id + i) % 200 + 1,
+        'name': 'Product',
+        'price': 10.0,
+        'quantity': 1,
+    } for order_id in order_ids for i in range(items_per_order)]
+    db.session.execute(db.insert(OrderItem), items)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10,1000,10000')
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+
+    statements = []
+    with order_app.app.app_context():
+        event.listen(order_app.db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    counts = set()
+    print(f"{'orders':>7} {'route':<22} {'queries':>8} {'ms':>9}")
+    for size in [int(size) for size in args.sizes.split(',')]:
+        with order_app.app.app_context():
+            seed_orders(order_app, size)
+        for route in ('/order-api/my-orders', '/order-api/orders'):
+            client.get(route, headers=headers)  # warm the product cache
+            statements.clear()
+            start = time.perf_counter()
+            response = client.get(route, headers=headers)
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200
+            counts.add((route, len(statements)))
+            print(f"{size:>7} {route:<22} {len(statements):>8} {elapsed * 1000:>9.1f}")
+
+    server.shutdown()
+    routes = {route for route, _ in counts}
+    if len(counts) != len(routes):
+        print("query count depends on the number of orders")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
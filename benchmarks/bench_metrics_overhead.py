@@ -0,0 +1,47 @@
+"""Cost of the metrics recorded for one request, in multiprocess mode.
+
+One request observes the route histogram, the two per-request DB
+histograms, one query histogram per statement and a few cache counters.
+
+    python -m benchmarks.bench_metrics_overhead --queries 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=4)
+    args = parser.parse_args()
+
+    # Must be set before prometheus_client is imported, as gunicorn.conf.py does
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp()
+    import metrics
+
+    jwt_hit = metrics.CACHE_LOOKUPS.labels('jwt', 'hit')
+    product_hit = metrics.CACHE_LOOKUPS.labels('product', 'hit')
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        metrics.HTTP_REQUEST_DURATION.labels('GET', '/order-api/my-orders', '200').observe(0.012)
+        metrics.DB_QUERIES_PER_REQUEST.labels('/order-api/my-orders').observe(args.queries)
+        metrics.DB_TIME_PER_REQUEST.labels('/order-api/my-orders').observe(0.004)
+        for _ in range(args.queries):
+            metrics.DB_QUERY_DURATION.observe(0.001)
+            metrics.DB_POOL_WAIT.observe(0.00001)
+        jwt_hit.inc()
+        for _ in range(5):
+            product_hit.inc()
+    elapsed = time.perf_counter() - start
+
+    started = time.perf_counter()
+    body, _ = metrics.render()
+    scrape = time.perf_counter() - started
+    print(f"per request: {elapsed / args.requests * 1e6:.1f} us ({args.queries} queries)")
+    print(f"scrape: {scrape * 1000:.1f} ms, {len(body)} bytes")
+
+
+if __name__ == '__main__':
+    main()
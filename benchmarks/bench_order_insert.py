@@ -0,0 +1,68 @@
+"""Order item insert throughput: one ORM add per item vs a single bulk INSERT.
+
+Runs against DATABASE_URL when it is set (use a disposable database),
+otherwise against a temporary SQLite file.
+
+    python -m benchmarks.bench_order_insert --cart-sizes 10,100,1000 --orders 20
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import configure_env
+from benchmarks.stubs import start_inventory_stub
+
+
+def new_order(order_app):
+    order = order_app.Order(
+        user_id='1', total_amount=0, shipping_name='Bench User', shipping_address1='1 Bench Road',
+        shipping_city='Dhaka', shipping_state='Dhaka', shipping_postal_code='1200', shipping_country='BD',
+    )
+    order_app.db.session.add(order)
+    order_app.db.session.flush()
+    return order
+
+
+def per_item(order_app, cart_size):
+    order = new_order(order_app)
+    for i in range(cart_size):
+        order_app.db.session.add(order_app.OrderItem(
+            order_id=order.id, product_id=i + 1, name='Product', price=9.99, quantity=1,
+        ))
+    order_app.db.session.commit()
+    return len(order.items)
+
+
+def bulk(order_app, cart_size):
+    order = new_order(order_app)
+    items = [{'order_id': order.id, 'product_id': i + 1, 'name': 'Product', 'price': 9.99, 'quantity': 1}
+             for i in range(cart_size)]
+    order_app.db.session.execute(order_app.db.insert(order_app.OrderItem), items)
+    order_app.db.session.commit()
+    return len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cart-sizes', default='10,100,1000')
+    parser.add_argument('--orders', type=int, default=20)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url, database_url=os.environ.get('DATABASE_URL'))
+
+    import app as order_app
+    print(f"{'cart':>6} {'per-item rows/s':>16} {'bulk rows/s':>12}")
+    with order_app.app.app_context():
+        for cart_size in [int(size) for size in args.cart_sizes.split(',')]:
+            rates = []
+            for write in (per_item, bulk):
+                start = time.perf_counter()
+                rows = sum(write(order_app, cart_size) for _ in range(args.orders))
+                rates.append(rows / (time.perf_counter() - start))
+            print(f"{cart_size:>6} {rates[0]:>16.0f} {rates[1]:>12.0f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""GET /order-api/my-orders/summary against paging through /my-orders and
+aggregating client-side, as the user's order count grows.
+
+Also checks that the summary matches a GROUP BY over the order table.
+
+    python -m benchmarks.bench_order_summary --sizes 100,1000,10000
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks.bench_listing_queries import seed_orders
+from benchmarks.common import auth_header, configure_env, summarize
+from benchmarks.stubs import start_inventory_stub
+
+STATUSES = ('pending', 'processing', 'confirm', 'delivered', 'cancelled')
+
+
+def seed_summary(order_app):
+    # seed_orders bypasses the write paths, so rebuild the aggregates the
+    # way the migration does
+    db, Order = order_app.db, order_app.Order
+    db.session.query(order_app.OrderSummary).delete()
+    rows = db.session.query(Order.id, Order.user_id, Order.total_amount, Order.status).all()
+    order_app.record_order_summary([(row.id, row.user_id, row.total_amount, None, row.status) for row in rows])
+    db.session.commit()
+
+
+def client_side_summary(client, headers):
+    by_status = {}
+    url = '/order-api/my-orders?limit=200'
+    while url:
+        response = client.get(url, headers=headers)
+        for order in response.get_json():
+            count, total = by_status.get(order['status'], (0, 0.0))
+            by_status[order['status']] = (count + 1, total + order['totalAmount'])
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f"/order-api/my-orders?limit=200&cursor={cursor}" if cursor else None
+    return by_status
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+
+    queries = [0]
+    event.listen(order_app.engine, 'before_cursor_execute', lambda *a: queries.__setitem__(0, queries[0] + 1))
+
+    print(f"{'orders':>7} {'summary p50 ms':>15} {'sql':>4} {'paged p50 ms':>13} {'sql':>5}")
+    ok = True
+    for size in [int(size) for size in args.sizes.split(',')]:
+        with order_app.app.app_context():
+            seed_orders(order_app, size, items_per_order=1, statuses=STATUSES)
+            seed_summary(order_app)
+            expected = {
+                status: (count, total) for status, count, total in order_app.db.session.query(
+                    order_app.Order.status, order_app.db.func.count(), order_app.db.func.sum(order_app.Order.total_amount),
+                ).group_by(order_app.Order.status)
+            }
+
+        samples = []
+        for _ in range(args.requests):
+            queries[0] = 0
+            start = time.perf_counter()
+            response = client.get('/order-api/my-orders/summary', headers=headers)
+            samples.append(time.perf_counter() - start)
+        summary_queries = queries[0]
+        by_status = response.get_json()['byStatus']
+        if {status: (entry['count'], entry['totalAmount']) for status, entry in by_status.items()} != expected:
+            print(f"summary mismatch at {size}: {by_status} != {expected}")
+            ok = False
+
+        paged = []
+        for _ in range(max(1, args.requests // 5)):
+            queries[0] = 0
+            start = time.perf_counter()
+            client_side_summary(client, headers)
+            paged.append(time.perf_counter() - start)
+        print(f"{size:>7} {summarize(samples)['p50_ms']:>15.2f} {summary_queries:>4} "
+              f"{summarize(paged)['p50_ms']:>13.1f} {queries[0]:>5}")
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
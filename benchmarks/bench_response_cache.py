@@ -0,0 +1,60 @@
+"""Latency of GET /order-api/orders/<id> and /order-api/my-orders with and without the response cache.
+
+Compares no cache, the per-process cache and (with --redis-url) Redis,
+each for a full 200 response and for a 304 revalidation.
+
+    python -m benchmarks.bench_response_cache --requests 2000 [--redis-url redis://localhost:6379/0]
+"""
+import argparse
+import time
+
+from benchmarks.bench_listing_queries import seed_orders
+from benchmarks.common import auth_header, configure_env, summarize
+from benchmarks.stubs import start_inventory_stub
+
+
+def measure(client, route, headers, count, expected):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(route, headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == expected, response.status_code
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--redis-url')
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    from cache import ResponseCache
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+    with order_app.app.app_context():
+        seed_orders(order_app, 200)
+        order_id = order_app.Order.query.filter_by(user_id='1').first().id
+
+    caches = [('none', ResponseCache(60, 10000)), ('local', ResponseCache(60, 10000, local=True))]
+    if args.redis_url:
+        caches.append(('redis', ResponseCache(60, 10000, redis_url=args.redis_url)))
+
+    print(f"{'cache':<6} {'route':<28} {'status':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, response_cache in caches:
+        order_app.response_cache = response_cache
+        for route in (f"/order-api/orders/{order_id}", '/order-api/my-orders?limit=20'):
+            etag = client.get(route, headers=headers).headers['ETag']
+            for status, extra in ((200, {}), (304, {'If-None-Match': etag})):
+                result = measure(client, route, {**headers, **extra}, args.requests, status)
+                print(f"{name:<6} {route:<28} {status:>6} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
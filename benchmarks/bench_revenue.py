@@ -0,0 +1,86 @@
+"""Money exactness and SQL-side revenue aggregation.
+
+Creates orders through the API with prices like 9.99 and checks that every
+stored total equals the sum of its item prices and that the summaries and
+revenue report match to the cent. Then times GET /order-api/orders/revenue
+against exporting every order and summing client-side.
+
+    python -m benchmarks.bench_revenue --orders 200 --sizes 1000,10000,50000
+"""
+import argparse
+import decimal
+import json
+import sys
+import time
+
+from benchmarks.bench_listing_queries import seed_orders
+from benchmarks.common import auth_header, configure_env, shipping_address, summarize
+from benchmarks.stubs import start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=200, help='orders created through the API for the exactness check')
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    admin = auth_header(order_app.JWT_SECRET_KEY, 1, is_staff=True)
+    db, Order, OrderItem = order_app.db, order_app.Order, order_app.OrderItem
+
+    for index in range(args.orders):
+        payload = {
+            'items': [{'productId': (index + i) % 50 + 1, 'quantity': i + 1} for i in range(3)],
+            'shippingAddress': shipping_address(),
+        }
+        response = client.post('/order-api/orders', json=payload, headers=auth_header(order_app.JWT_SECRET_KEY, index % 7 + 1))
+        assert response.status_code == 201, response.get_data(as_text=True)
+
+    ok = True
+    with order_app.app.app_context():
+        item_totals = dict(db.session.execute(
+            db.select(OrderItem.order_id, db.func.sum(OrderItem.price * OrderItem.quantity)).group_by(OrderItem.order_id)
+        ).all())
+        mismatched = [order.id for order in Order.query if order.total_amount != item_totals[order.id]]
+        grand_total = sum(item_totals.values(), decimal.Decimal('0.00'))
+    revenue = client.get('/order-api/orders/revenue', headers=admin).get_json()
+    summary = client.get('/order-api/orders/summary', headers=admin).get_json()
+    print(f"{args.orders} orders: {len(mismatched)} totals differ from their items; "
+          f"items {grand_total}, summary {summary['totalAmount']}, revenue {revenue['revenue']}")
+    if mismatched or not (str(grand_total) == f"{summary['totalAmount']:.2f}" == f"{revenue['revenue']:.2f}"):
+        ok = False
+
+    print(f"{'orders':>7} {'sql p50 ms':>11} {'export+sum p50 ms':>18}")
+    for size in [int(size) for size in args.sizes.split(',')]:
+        with order_app.app.app_context():
+            seed_orders(order_app, size, users=50, items_per_order=1)
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get('/order-api/orders/revenue', headers=admin)
+            samples.append(time.perf_counter() - start)
+        sql_revenue = response.get_json()['revenue']
+
+        exported = []
+        for _ in range(max(1, args.requests // 5)):
+            start = time.perf_counter()
+            body = client.get('/order-api/orders?format=ndjson', headers=admin).get_data()
+            total = sum(decimal.Decimal(str(json.loads(line)['totalAmount'])) for line in body.splitlines())
+            exported.append(time.perf_counter() - start)
+        if f"{total:.2f}" != f"{sql_revenue:.2f}":
+            print(f"revenue mismatch at {size}: {total} != {sql_revenue}")
+            ok = False
+        print(f"{size:>7} {summarize(samples)['p50_ms']:>11.2f} {summarize(exported)['p50_ms']:>18.1f}")
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
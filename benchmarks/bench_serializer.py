@@ -0,0 +1,96 @@
+"""Order list serialisation time and response size: per-endpoint dict building + jsonify vs serializers.
+
+    python -m benchmarks.bench_serializer --sizes 1000,10000
+"""
+import argparse
+import datetime
+import time
+from collections import namedtuple
+
+from flask import Flask, jsonify
+
+from serializers import dumps, serialize_order
+
+OrderRow = namedtuple('OrderRow', [
+    'id', 'user_id', 'total_amount', 'status', 'payment_status', 'shipping_name', 'shipping_address1',
+    'shipping_address2', 'shipping_city', 'shipping_state', 'shipping_postal_code', 'shipping_country',
+    'tracking_number', 'created_at', 'updated_at',
+])
+ItemRow = namedtuple('ItemRow', ['order_id', 'product_id', 'name', 'price', 'quantity'])
+
+
+def make_rows(count, items_per_order=3):
+    now = datetime.datetime.utcnow()
+    orders = [OrderRow(i, str(i % 100), 29.97, 'pending', 'pending', 'Bench User', '1 Bench Road', '',
+                       'Dhaka', 'Dhaka', '1200', 'BD', None, now, now) for i in range(count)]
+    items = {i: [ItemRow(i, j + 1, f"Product {j + 1}", 9.99, 1) for j in range(items_per_order)] for i in range(count)}
+    images = {j + 1: {'image': f"https://img.example/{j + 1}.png"} for j in range(items_per_order)}
+    return orders, items, images
+
+
+def old_serialize(orders, items, images):
+    # The dict construction each endpoint used to carry, followed by jsonify
+    return jsonify([{
+        'id': order.id,
+        'userId': order.user_id,
+        'totalAmount': order.total_amount,
+        'status': order.status,
+        'paymentStatus': order.payment_status,
+        'shippingAddress': {
+            'fullName': order.shipping_name,
+            'addressLine1': order.shipping_address1,
+            'addressLine2': order.shipping_address2,
+            'city': order.shipping_city,
+            'state': order.shipping_state,
+            'postalCode': order.shipping_postal_code,
+            'country': order.shipping_country
+        },
+        'trackingNumber': order.tracking_number,
+        'createdAt': order.created_at.isoformat(),
+        'updatedAt': order.updated_at.isoformat(),
+        'items': [{
+            'productId': item.product_id,
+            'name': item.name,
+            'price': item.price,
+            'quantity': item.quantity,
+            'image': images.get(item.product_id, {}).get('image')
+        } for item in items[order.id]]
+    } for order in orders]).get_data()
+
+
+def new_serialize(orders, items, images, fields=None):
+    return dumps([serialize_order(order, items[order.id], fields, images) for order in orders])
+
+
+def measure(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print(f"{'orders':>7} {'variant':<32} {'ms':>9} {'bytes':>11}")
+    with app.app_context():
+        for size in [int(size) for size in args.sizes.split(',')]:
+            orders, items, images = make_rows(size)
+            variants = [
+                ('dicts + jsonify (old)', lambda: old_serialize(orders, items, images)),
+                ('serialize_order + dumps', lambda: new_serialize(orders, items, images)),
+                ('fields=id,status,totalAmount', lambda: new_serialize(orders, items, images, {'id', 'status', 'totalAmount'})),
+            ]
+            for label, fn in variants:
+                elapsed, size_bytes = measure(fn)
+                print(f"{size:>7} {label:<32} {elapsed * 1000:>9.1f} {size_bytes:>11}")
+
+
+if __name__ == '__main__':
+    main()
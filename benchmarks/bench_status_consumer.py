@@ -0,0 +1,68 @@
+"""Status consumer throughput against the in-memory broker stand-in.
+
+Queues --messages status updates (a tenth of them redeliveries of earlier
+message ids) and drains them with each prefetch size, reporting messages
+per second. Exits non-zero if an update was lost or applied twice.
+
+    python -m benchmarks.bench_status_consumer --messages 5000 --prefetch 1,50,200
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.bench_listing_queries import seed_orders
+from benchmarks.common import configure_env
+from benchmarks.stubs import InMemoryBroker, start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--prefetch', default='1,50,200')
+    parser.add_argument('--rpc-latency', type=float, default=0.0005)
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+    broker = InMemoryBroker(rpc_latency=args.rpc_latency).install()
+
+    import app as order_app
+    from status_consumer import STATUS_CONSUMER_QUEUE, StatusConsumer
+    order_app.app.logger.disabled = True
+
+    print(f"{'prefetch':>8} {'messages':>8} {'seconds':>8} {'msg/s':>9}")
+    failed = False
+    for prefetch in [int(prefetch) for prefetch in args.prefetch.split(',')]:
+        with order_app.app.app_context():
+            seed_orders(order_app, args.messages)
+            order_app.ProcessedMessage.query.delete()
+            order_app.db.session.commit()
+            order_ids = [row.id for row in order_app.db.session.query(order_app.Order.id)]
+
+        unique = args.messages - args.messages // 10
+        for index in range(args.messages):
+            n = index if index < unique else index - unique
+            body = json.dumps({'eventId': f"payment-{n}", 'data': {'orderId': order_ids[n], 'paymentStatus': 'paid'}})
+            broker.enqueue(STATUS_CONSUMER_QUEUE, body.encode())
+
+        consumer = StatusConsumer(prefetch=prefetch, batch_wait=0.001)
+        with order_app.app.app_context():
+            connection, channel = consumer.connect()
+            start = time.perf_counter()
+            consumer.consume(channel, max_messages=args.messages)
+            elapsed = time.perf_counter() - start
+            paid = order_app.Order.query.filter_by(payment_status='paid').count()
+            keys = order_app.ProcessedMessage.query.count()
+        print(f"{prefetch:>8} {args.messages:>8} {elapsed:>8.2f} {args.messages / elapsed:>9.0f}")
+        if paid != unique or keys != unique:
+            print(f"  expected {unique} paid orders and keys, found {paid} and {keys}")
+            failed = True
+
+    server.shutdown()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
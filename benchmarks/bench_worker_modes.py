@@ -0,0 +1,142 @@
+"""Max sustainable RPS of one gunicorn worker per concurrency mode.
+
+Starts gunicorn with gunicorn.conf.py for each GUNICORN_WORKER_CLASS and
+drives GET /order-api/my-orders with a rising number of concurrent
+clients. Every request looks up product images on a slow inventory stub
+(the image TTL is 0 and stale images are not served), so it mostly waits
+on I/O. A level is sustainable
+when under 1% of requests fail and p99 stays within --slo-ms.
+
+    python -m benchmarks.bench_worker_modes --modes sync,gthread,gevent --latency 0.2
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.common import auth_header, configure_env, percentile
+from benchmarks.stubs import start_inventory_stub_process
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(mode, port, threads):
+    env = dict(os.environ,
+               GUNICORN_WORKER_CLASS=mode,
+               GUNICORN_WORKERS='1',
+               GUNICORN_THREADS=str(threads),
+               GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_ACCESS_LOG=os.environ.get('GUNICORN_ACCESS_LOG', ''),
+               LOG_LEVEL='WARNING')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/order-api/health", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({mode}) did not start")
+
+
+def run_level(url, headers, concurrency, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, headers=headers, timeout=10).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = len(latencies) + len(errors)
+    return {
+        'rps': len(latencies) / duration,
+        'error_rate': len(errors) / total if total else 1.0,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else float('inf'),
+    }
+
+
+def seed(orders):
+    import app as order_app
+    from benchmarks.bench_listing_queries import seed_orders
+    with order_app.app.app_context():
+        seed_orders(order_app, orders)
+    return order_app.JWT_SECRET_KEY
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--levels', default='1,4,16,64')
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--slo-ms', type=float, default=1000)
+    args = parser.parse_args()
+
+    stub, inventory_url = start_inventory_stub_process(latency=args.latency)
+    configure_env(inventory_url)
+    os.environ['PRODUCT_CACHE_FIELD_TTLS'] = 'price=30,name=3600,image=0'
+    # Otherwise expired images are served stale and refreshed off the request path
+    os.environ['PRODUCT_CACHE_STALE_TTL'] = '0'
+    os.environ['ORDER_LOG_FILE'] = ''
+    secret = seed(200)
+    headers = auth_header(secret, 1)
+
+    best = {}
+    print(f"{'mode':<8} {'clients':>7} {'rps':>8} {'p99 ms':>9} {'errors':>7}")
+    for mode in args.modes.split(','):
+        port = free_port()
+        try:
+            process = start_gunicorn(mode, port, args.threads)
+        except RuntimeError as e:
+            print(f"{mode:<8} skipped: {e}")
+            continue
+        url = f"http://127.0.0.1:{port}/order-api/my-orders?limit=5"
+        requests.get(url, headers=headers, timeout=30)  # first request warms up the worker
+        try:
+            for level in [int(level) for level in args.levels.split(',')]:
+                result = run_level(url, headers, level, args.duration)
+                print(f"{mode:<8} {level:>7} {result['rps']:>8.1f} {result['p99_ms']:>9.1f} {result['error_rate']:>7.1%}")
+                if result['error_rate'] < 0.01 and result['p99_ms'] <= args.slo_ms:
+                    best[mode] = max(best.get(mode, 0.0), result['rps'])
+        finally:
+            process.terminate()
+            process.wait()
+
+    print()
+    for mode, rps in best.items():
+        print(f"{mode:<8} max sustainable rps: {rps:.1f}")
+    stub.terminate()
+
+
+if __name__ == '__main__':
+    main()
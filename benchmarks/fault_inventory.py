@@ -0,0 +1,142 @@
+"""Order endpoints while the inventory stub is healthy, slow, failing or down.
+
+    python -m benchmarks.fault_inventory --orders 20 --requests 30
+
+Each phase reports listing latency and how many items still had an image,
+order creation latency and status codes, and the inventory circuit state.
+Product TTLs are shortened so every listing runs on expired cache entries,
+i.e. on the stale-while-revalidate path.
+
+Exits 1 unless the degraded-mode guarantees hold in every phase:
+
+- listings succeed, every item keeps its image and p99 stays under
+  --listing-slo-ms, however inventory behaves
+- creates succeed while inventory is healthy or has recovered
+- creates fail with 503 while it is slow, failing or down, most of them
+  fast (p50 under the inventory timeout) because the circuit is open
+- the circuit is open after each bad phase and closed after recovery
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+
+from benchmarks.common import auth_header, configure_env, shipping_address, summarize
+from benchmarks.stubs import start_inventory_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=20, help='orders seeded for the listing user')
+    parser.add_argument('--requests', type=int, default=30, help='listings and creates per phase')
+    parser.add_argument('--timeout', type=float, default=0.2, help='INVENTORY_TIMEOUT for the app')
+    parser.add_argument('--reset', type=float, default=1.0, help='INVENTORY_BREAKER_RESET for the app')
+    parser.add_argument('--listing-slo-ms', type=float, default=100, help='listing p99 bound in every phase')
+    args = parser.parse_args()
+
+    server, inventory_url = start_inventory_stub()
+    configure_env(inventory_url)
+    os.environ['INVENTORY_TIMEOUT'] = str(args.timeout)
+    os.environ['INVENTORY_BREAKER_RESET'] = str(args.reset)
+    os.environ['PRODUCT_CACHE_FIELD_TTLS'] = 'price=0.05,name=0.05,image=0.05'
+
+    import app as order_app
+    from inventory import inventory_client
+    order_app.app.logger.disabled = True
+    client = order_app.app.test_client()
+    headers = auth_header(order_app.JWT_SECRET_KEY, 1)
+
+    def order_payload(index):
+        return {
+            'items': [{'productId': index % 10 + 1, 'quantity': 1}, {'productId': index % 10 + 11, 'quantity': 2}],
+            'shippingAddress': shipping_address(),
+        }
+
+    for index in range(args.orders):
+        assert client.post('/order-api/orders', json=order_payload(index), headers=headers).status_code == 201
+
+    failures = []
+
+    def settled_circuit():
+        # A background refresh may still be running, possibly as the
+        # half-open trial; wait for it to finish and the state to settle
+        deadline = time.monotonic() + 2 * args.timeout + args.reset
+        while time.monotonic() < deadline:
+            stats = inventory_client.stats()
+            if not stats['refreshing'] and stats['state'] != 'half_open':
+                break
+            time.sleep(0.01)
+        return inventory_client.breaker.state
+
+    def run_phase(name, healthy):
+        listing, creating = [], []
+        with_image = total_items = 0
+        statuses = collections.Counter()
+        for index in range(args.requests):
+            time.sleep(0.06)  # let every cached field expire
+            start = time.perf_counter()
+            response = client.get(f"/order-api/my-orders?limit={args.orders}", headers=headers)
+            listing.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures.append(f"{name}: listing returned {response.status_code}")
+                continue
+            for order in response.get_json():
+                for item in order['items']:
+                    total_items += 1
+                    with_image += item.get('image') is not None
+
+            start = time.perf_counter()
+            response = client.post('/order-api/orders', json=order_payload(index), headers=auth_header(order_app.JWT_SECRET_KEY, 2))
+            creating.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+        listing_stats, create_stats = summarize(listing), summarize(creating)
+        circuit = settled_circuit()
+        print(f"{name:>9} {listing_stats['p50_ms']:>8.1f} {listing_stats['p99_ms']:>8.1f} "
+              f"{with_image / max(total_items, 1):>7.0%} {create_stats['p50_ms']:>8.1f} {create_stats['p99_ms']:>8.1f} "
+              f"{dict(sorted(statuses.items()))!s:>18} {circuit:>10}")
+
+        def check(condition, message):
+            if not condition:
+                failures.append(f"{name}: {message}")
+
+        check(listing_stats['p99_ms'] <= args.listing_slo_ms,
+              f"listing p99 {listing_stats['p99_ms']:.1f} ms over {args.listing_slo_ms:.0f} ms")
+        check(with_image == total_items, f"{total_items - with_image} of {total_items} items without an image")
+        if healthy:
+            check(set(statuses) == {201}, f"creates returned {dict(statuses)}, expected only 201")
+            check(circuit == 'closed', f"circuit {circuit}, expected closed")
+        else:
+            check(set(statuses) == {503}, f"creates returned {dict(statuses)}, expected only 503")
+            check(circuit == 'open', f"circuit {circuit}, expected open")
+            check(create_stats['p50_ms'] < args.timeout * 1000,
+                  f"create p50 {create_stats['p50_ms']:.1f} ms, not failing fast")
+
+    print(f"inventory timeout {args.timeout * 1000:.0f} ms, breaker reset {args.reset:.1f} s")
+    print(f"{'phase':>9} {'list p50':>8} {'list p99':>8} {'images':>7} {'new p50':>8} {'new p99':>8} {'create statuses':>18} {'circuit':>10}")
+    run_phase('healthy', healthy=True)
+
+    server.latency = args.timeout * 5
+    run_phase('slow', healthy=False)
+
+    server.latency = 0
+    server.status = 500
+    run_phase('failing', healthy=False)
+
+    server.status = 200
+    time.sleep(args.reset)
+    run_phase('recovered', healthy=True)
+
+    server.shutdown()
+    server.server_close()
+    time.sleep(args.reset)
+    run_phase('down', healthy=False)
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    print('all degraded-mode checks passed' if not failures else f"{len(failures)} checks failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
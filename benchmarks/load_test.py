@@ -0,0 +1,365 @@
+"""Load test of every order-service route against local stand-ins.
+
+    python -m benchmarks.load_test --users 50 --orders-per-user 40 --concurrency 8 \
+        --duration 5 --output results.json
+    python -m benchmarks.load_test ... --compare results.json --max-regression 0.2
+
+Stand-ins:
+
+- a SQLite file for PostgreSQL, unless --database-url points at a real one
+- the inventory stub HTTP server, in its own process (--inventory-latency)
+- InMemoryBroker for RabbitMQ, installed in this process, where an outbox
+  relay thread publishes the events the routes write
+
+The database is seeded with --users x --orders-per-user orders, then the app
+is started under gunicorn with gunicorn.conf.py (GUNICORN_* variables
+apply) and each route is driven in turn by --concurrency clients for
+--duration seconds. Per route it reports throughput, p50/p95/p99 latency,
+error rate, SQL statements per request (from /order-api/metrics; a
+streamed export runs its queries after the count is taken, so it reads 0)
+and the RSS of the gunicorn processes afterwards. --output writes the results as
+JSON; --compare prints the change against such a file and, with
+--max-regression, exits 1 when a route's rps or p99 got worse by more than
+that fraction.
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.bench_worker_modes import ROOT, free_port
+from benchmarks.common import auth_header, configure_env, percentile, shipping_address
+from benchmarks.stubs import InMemoryBroker, start_inventory_stub_process
+
+STATUSES = ('pending', 'processing', 'confirm', 'delivered', 'cancelled')
+PRODUCTS = 200
+
+
+def seed(order_app, users, orders_per_user, items_per_order):
+    db, Order, OrderItem = order_app.db, order_app.Order, order_app.OrderItem
+    now = datetime.datetime.utcnow()
+    total = users * orders_per_user
+    for start in range(0, total, 10000):
+        db.session.execute(db.insert(Order), [{
+            'user_id': str(i % users + 1),
+            'total_amount': 30 * items_per_order,
+            'status': STATUSES[i // users % len(STATUSES)],
+            'payment_status': 'paid',
+            'shipping_name': 'Load Test',
+            'shipping_address1': '1 Bench Road',
+            'shipping_city': 'Dhaka',
+            'shipping_state': 'Dhaka',
+            'shipping_postal_code': '1200',
+            'shipping_country': 'BD',
+            'created_at': now - datetime.timedelta(minutes=total - i),
+            'updated_at': now,
+        } for i in range(start, min(start + 10000, total))])
+    orders = db.session.query(Order.id, Order.user_id, Order.total_amount, Order.status).all()
+    for start in range(0, len(orders), 5000):
+        db.session.execute(db.insert(OrderItem), [{
+            'order_id': order.id,
+            'product_id': (order.id + i) % PRODUCTS + 1,
+            'name': 'Product',
+            'price': 30,
+            'quantity': 1,
+        } for order in orders[start:start + 5000] for i in range(items_per_order)])
+    order_app.record_order_summary([(order.id, order.user_id, order.total_amount, None, order.status) for order in orders])
+    db.session.commit()
+    return orders
+
+
+def start_server(port, metrics_dir):
+    env = dict(os.environ,
+               GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_ACCESS_LOG='',
+               PROMETHEUS_MULTIPROC_DIR=metrics_dir,
+               LOG_LEVEL='WARNING')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/order-api/health", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('gunicorn did not start')
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of pid and its children, from /proc."""
+    children = collections.defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; ppid follows its closing paren
+                    children[int(f.read().rsplit(')', 1)[1].split()[1])].append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def query_counts(base_url):
+    """{route: (sql statements, requests)} from the server's Prometheus metrics."""
+    counts = collections.defaultdict(lambda: [0.0, 0.0])
+    text = requests.get(f"{base_url}/order-api/metrics", timeout=10).text
+    for family in text_string_to_metric_families(text):
+        if family.name != 'order_db_queries_per_request':
+            continue
+        for sample in family.samples:
+            if sample.name.endswith('_sum'):
+                counts[sample.labels['route']][0] += sample.value
+            elif sample.name.endswith('_count'):
+                counts[sample.labels['route']][1] += sample.value
+    return counts
+
+
+def build_routes(secret, orders, users):
+    """(name, metrics route label, expected status, make_request) for every route."""
+    tokens = {str(user): auth_header(secret, user) for user in range(1, users + 1)}
+    admin = auth_header(secret, users + 1, is_staff=True)
+    owned = [(order.id, order.user_id) for order in orders]
+    updatable = [order.id for order in orders if order.status != 'delivered']
+    # Each cancel needs its own pending order
+    cancellable = collections.deque((order.id, order.user_id) for order in orders if order.status == 'pending')
+
+    def create(rng):
+        items = [{'productId': rng.randint(1, PRODUCTS), 'quantity': rng.randint(1, 3)} for _ in range(3)]
+        return 'POST', '/order-api/orders', tokens[str(rng.randint(1, users))], {'items': items, 'shippingAddress': shipping_address()}
+
+    def cancel(rng):
+        try:
+            order_id, user_id = cancellable.popleft()
+        except IndexError:
+            return None
+        return 'POST', f"/order-api/orders/{order_id}/cancel", tokens[user_id], None
+
+    def get_order(rng):
+        order_id, user_id = rng.choice(owned)
+        return 'GET', f"/order-api/orders/{order_id}", tokens[user_id], None
+
+    def bulk_status(rng):
+        updates = [{'orderId': order_id, 'trackingNumber': f"T{rng.randint(1, 10 ** 6)}"} for order_id in rng.sample(updatable, 50)]
+        return 'POST', '/order-api/internal/orders/status', {}, updates
+
+    return [
+        ('health', '/order-api/health', 200, lambda rng: ('GET', '/order-api/health', {}, None)),
+        ('create_order', '/order-api/orders', 201, create),
+        ('my_orders', '/order-api/my-orders', 200,
+         lambda rng: ('GET', '/order-api/my-orders?limit=20', tokens[str(rng.randint(1, users))], None)),
+        ('my_orders_export', '/order-api/my-orders', 200,
+         lambda rng: ('GET', '/order-api/my-orders?format=ndjson', tokens[str(rng.randint(1, users))], None)),
+        ('admin_orders', '/order-api/orders', 200, lambda rng: ('GET', '/order-api/orders?limit=50', admin, None)),
+        ('admin_orders_by_status', '/order-api/orders', 200,
+         lambda rng: ('GET', f"/order-api/orders?limit=50&status={rng.choice(STATUSES)}", admin, None)),
+        ('get_order', '/order-api/orders/<int:order_id>', 200, get_order),
+        ('my_summary', '/order-api/my-orders/summary', 200,
+         lambda rng: ('GET', '/order-api/my-orders/summary', tokens[str(rng.randint(1, users))], None)),
+        ('admin_summary', '/order-api/orders/summary', 200, lambda rng: ('GET', '/order-api/orders/summary', admin, None)),
+        ('revenue', '/order-api/orders/revenue', 200, lambda rng: ('GET', '/order-api/orders/revenue', admin, None)),
+        ('update_status', '/order-api/internal/orders/<int:order_id>/status', 200,
+         lambda rng: ('PUT', f"/order-api/internal/orders/{rng.choice(updatable)}/status", {},
+                      {'trackingNumber': f"T{rng.randint(1, 10 ** 6)}"})),
+        ('bulk_status', '/order-api/internal/orders/status', 200, bulk_status),
+        ('cancel_order', '/order-api/orders/<int:order_id>/cancel', 200, cancel),
+    ]
+
+
+def drive(base_url, make_request, expected, concurrency, duration, seed):
+    latencies, errors = [], collections.Counter()
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            spec = make_request(rng)
+            if spec is None:
+                return
+            method, path, headers, body = spec
+            start = time.perf_counter()
+            try:
+                status = session.request(method, base_url + path, headers=headers, json=body, timeout=30).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == expected:
+                    latencies.append(elapsed)
+                else:
+                    errors[status] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    ordered = sorted(latencies)
+    return {
+        'requests': len(latencies) + sum(errors.values()),
+        'errors': sum(errors.values()),
+        'error_statuses': {str(status): count for status, count in errors.items()},
+        'rps': round(len(latencies) / elapsed, 2),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3) if ordered else None,
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3) if ordered else None,
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3) if ordered else None,
+    }
+
+
+def run_relay(order_app, stop, stats):
+    import outbox_relay
+    from messaging import RABBITMQ_URL, EventPublisher
+    publisher = EventPublisher(RABBITMQ_URL, confirm=True)
+    with order_app.app.app_context():
+        while not stop.is_set():
+            published, _ = outbox_relay.relay_batch(publisher)
+            stats['published'] += published
+            if published < outbox_relay.OUTBOX_BATCH_SIZE:
+                stop.wait(outbox_relay.OUTBOX_POLL_INTERVAL)
+
+
+def compare(results, baseline_path, max_regression):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nagainst {baseline_path} ({baseline['meta'].get('git_commit', '?')[:10]})")
+    print(f"{'route':<24} {'rps':>9} {'change':>8} {'p99 ms':>9} {'change':>8}")
+    regressed = []
+    for name, result in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if not before or not before['rps'] or not before['p99_ms'] or result['p99_ms'] is None:
+            continue
+        rps_change = result['rps'] / before['rps'] - 1
+        p99_change = result['p99_ms'] / before['p99_ms'] - 1
+        flag = ''
+        if max_regression is not None and (rps_change < -max_regression or p99_change > max_regression):
+            regressed.append(name)
+            flag = '  REGRESSED'
+        print(f"{name:<24} {result['rps']:>9.1f} {rps_change:>+8.1%} {result['p99_ms']:>9.2f} {p99_change:>+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--orders-per-user', type=int, default=40)
+    parser.add_argument('--items-per-order', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5, help='seconds per route')
+    parser.add_argument('--routes', help='comma-separated subset of route names')
+    parser.add_argument('--inventory-latency', type=float, default=0.02)
+    parser.add_argument('--database-url', help='defaults to a new SQLite file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON here')
+    parser.add_argument('--compare', help='results JSON of an earlier run')
+    parser.add_argument('--max-regression', type=float, help='with --compare, fail above this fraction')
+    args = parser.parse_args()
+
+    stub, inventory_url = start_inventory_stub_process(latency=args.inventory_latency)
+    configure_env(inventory_url, args.database_url)
+    broker = InMemoryBroker().install()
+
+    import app as order_app
+    order_app.app.logger.disabled = True
+    with order_app.app.app_context():
+        orders = seed(order_app, args.users, args.orders_per_user, args.items_per_order)
+    routes = build_routes(order_app.JWT_SECRET_KEY, orders, args.users)
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = [route for route in routes if route[0] in wanted]
+
+    relay_stats = collections.Counter()
+    stop_relay = threading.Event()
+    relay = threading.Thread(target=run_relay, args=(order_app, stop_relay, relay_stats), daemon=True)
+    relay.start()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    metrics_dir = tempfile.mkdtemp(prefix='order-load-metrics-')
+    server = start_server(port, metrics_dir)
+    results = {
+        'meta': {
+            'timestamp': datetime.datetime.utcnow().isoformat(),
+            'git_commit': subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip(),
+            'python': platform.python_version(),
+            'worker_class': os.environ.get('GUNICORN_WORKER_CLASS', 'gthread'),
+            'workers': os.environ.get('GUNICORN_WORKERS', '3'),
+            'database': os.environ['DATABASE_URL'].split(':', 1)[0],
+            'orders_seeded': len(orders),
+            'args': vars(args),
+        },
+        'routes': {},
+    }
+
+    print(f"{len(orders)} orders, {args.users} users, {args.concurrency} clients, {args.duration:.0f}s per route")
+    print(f"{'route':<24} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'sql/req':>8} {'rss MB':>7}")
+    try:
+        for name, rule, expected, make_request in routes:
+            # One untimed request loads caches and connections
+            drive(base_url, make_request, expected, 1, 0.001, args.seed)
+            before = query_counts(base_url)
+            result = drive(base_url, make_request, expected, args.concurrency, args.duration, args.seed)
+            after = query_counts(base_url)
+            statements = after[rule][0] - before[rule][0]
+            handled = after[rule][1] - before[rule][1]
+            result['db_queries_per_request'] = round(statements / handled, 2) if handled else None
+            result['rss_mb'] = round(process_tree_rss_mb(server.pid), 1)
+            results['routes'][name] = result
+            print(f"{name:<24} {result['rps']:>9.1f} {result['p50_ms'] or 0:>8.2f} {result['p95_ms'] or 0:>8.2f} "
+                  f"{result['p99_ms'] or 0:>8.2f} {result['errors']:>7} {result['db_queries_per_request'] or 0:>8.2f} "
+                  f"{result['rss_mb']:>7.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+        stop_relay.set()
+        relay.join(timeout=5)
+        stub.terminate()
+
+    with order_app.app.app_context():
+        pending = order_app.OutboxEvent.query.filter(order_app.OutboxEvent.published_at.is_(None)).count()
+    results['outbox'] = {'published': relay_stats['published'], 'pending': pending, 'broker_messages': len(broker.published)}
+    print(f"outbox: {relay_stats['published']} events relayed to the in-memory broker, {pending} still pending")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        regressed = compare(results, args.compare, args.max_regression)
+        if regressed:
+            print(f"regressed: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
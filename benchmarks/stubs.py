@@ -0,0 +1,225 @@
+"""Local stand-ins for the services the order service talks to."""
+import collections
+import json
+import multiprocessing
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _InventoryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.calls += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        # Set server.status to inject failures
+        if getattr(self.server, 'status', 200) != 200:
+            self.send_response(self.server.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        product_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+        if not product_id.isdigit():
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps({
+            'id': int(product_id),
+            'name': f"Product {product_id}",
+            'price': 9.99 + int(product_id) % 50,
+            'image': f"https://img.example/{product_id}.png",
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts, which then wait out
+    # a 1s SYN retransmit
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out close the socket before the response is written
+        pass
+
+
+def start_inventory_stub(latency=0.0):
+    """Start a threaded stub of GET /api/products/inter-svc/<id>.
+
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = _StubServer(('127.0.0.1', 0), _InventoryHandler)
+    server.latency = latency
+    server.calls = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api"
+
+
+def _serve_inventory(latency, conn):
+    server = _StubServer(('127.0.0.1', 0), _InventoryHandler)
+    server.latency = latency
+    server.calls = 0
+    conn.send(server.server_port)
+    server.serve_forever()
+
+
+def start_inventory_stub_process(latency=0.0):
+    """Like start_inventory_stub, but in its own process so it does not share
+    a GIL with the load generator. Returns (process, base_url); call
+    process.terminate() when done.
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_inventory, args=(latency, child), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{parent.recv()}/api"
+
+
+class InMemoryBroker:
+    """Stand-in for RabbitMQ at the pika.BlockingConnection level.
+
+    Install it with `broker.install()`, which replaces pika.BlockingConnection
+    with a fake that sleeps for the configured handshake and round-trip
+    latencies and records every published message. Messages put on a queue
+    with `enqueue()` are delivered to consumers, honouring basic_qos
+    prefetch and acks.
+    """
+
+    def __init__(self, connect_latency=0.005, rpc_latency=0.0005):
+        self.connect_latency = connect_latency
+        self.rpc_latency = rpc_latency
+        self.connections = 0
+        self.published = []
+        self.queues = {}
+        self._lock = threading.Lock()
+
+    def install(self):
+        import pika
+        broker = self
+
+        class FakeBlockingConnection(_FakeConnection):
+            def __init__(self, parameters=None):
+                super().__init__(broker)
+
+        self._original = pika.BlockingConnection
+        pika.BlockingConnection = FakeBlockingConnection
+        return self
+
+    def uninstall(self):
+        import pika
+        pika.BlockingConnection = self._original
+
+    def record(self, exchange, routing_key, body):
+        with self._lock:
+            self.published.append((exchange, routing_key, body))
+
+    def enqueue(self, queue, body, message_id=None):
+        with self._lock:
+            self.queues.setdefault(queue, collections.deque()).append((body, message_id))
+
+
+class _FakeConnection:
+    def __init__(self, broker):
+        time.sleep(broker.connect_latency)
+        broker.connections += 1
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        time.sleep(self.broker.rpc_latency)
+        return _FakeChannel(self)
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        time.sleep(self.broker.rpc_latency)
+        self.is_open = False
+
+
+class _FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.confirm = False
+        self.prefetch = 0
+        self.unacked = collections.OrderedDict()
+        self.next_tag = 1
+        self.cancelled = False
+
+    @property
+    def is_open(self):
+        return self.connection.is_open
+
+    def exchange_declare(self, **kwargs):
+        time.sleep(self.connection.broker.rpc_latency)
+
+    def confirm_delivery(self):
+        time.sleep(self.connection.broker.rpc_latency)
+        self.confirm = True
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if self.confirm:
+            time.sleep(self.connection.broker.rpc_latency)
+        self.connection.broker.record(exchange, routing_key, body)
+
+    def queue_declare(self, queue='', **kwargs):
+        time.sleep(self.connection.broker.rpc_latency)
+        self.connection.broker.queues.setdefault(queue, collections.deque())
+        return types.SimpleNamespace(method=types.SimpleNamespace(queue=queue))
+
+    def queue_bind(self, **kwargs):
+        time.sleep(self.connection.broker.rpc_latency)
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        time.sleep(self.connection.broker.rpc_latency)
+        self.prefetch = prefetch_count
+
+    def consume(self, queue, inactivity_timeout=None):
+        broker = self.connection.broker
+        self.cancelled = False
+        while not self.cancelled:
+            message = None
+            with broker._lock:
+                pending = broker.queues.get(queue)
+                if pending and (not self.prefetch or len(self.unacked) < self.prefetch):
+                    message = pending.popleft()
+            if message is None:
+                if inactivity_timeout:
+                    time.sleep(inactivity_timeout)
+                yield None, None, None
+                continue
+            tag = self.next_tag
+            self.next_tag += 1
+            self.unacked[tag] = (queue, message)
+            body, message_id = message
+            yield (types.SimpleNamespace(delivery_tag=tag), types.SimpleNamespace(message_id=message_id), body)
+
+    def _settle(self, delivery_tag, multiple, requeue):
+        tags = [tag for tag in self.unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        broker = self.connection.broker
+        with broker._lock:
+            for tag in tags:
+                queue, message = self.unacked.pop(tag)
+                if requeue:
+                    broker.queues[queue].appendleft(message)
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        time.sleep(self.connection.broker.rpc_latency)
+        self._settle(delivery_tag, multiple, requeue=False)
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        time.sleep(self.connection.broker.rpc_latency)
+        self._settle(delivery_tag, multiple, requeue)
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        self.basic_nack(delivery_tag, multiple=False, requeue=requeue)
+
+    def cancel(self):
+        self.cancelled = True
@@ -0,0 +1,420 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pika
+
+from metrics import CACHE_LOOKUPS
+
+try:
+    import redis
+except ImportError:  # optional, only needed for a cross-worker cache
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_CACHE_MAX_SIZE = int(os.environ.get('PRODUCT_CACHE_MAX_SIZE', '10000'))
+# Seconds each product field stays fresh, e.g. "price=30,name=3600,image=3600"
+PRODUCT_CACHE_FIELD_TTLS = os.environ.get('PRODUCT_CACHE_FIELD_TTLS', 'price=30,name=3600,image=3600')
+PRODUCT_CACHE_DEFAULT_TTL = float(os.environ.get('PRODUCT_CACHE_DEFAULT_TTL', '300'))
+# Seconds past expiry a field may still be served while it is refreshed (image enrichment only)
+PRODUCT_CACHE_STALE_TTL = float(os.environ.get('PRODUCT_CACHE_STALE_TTL', '86400'))
+PRODUCT_CACHE_REDIS_URL = os.environ.get('PRODUCT_CACHE_REDIS_URL')
+PRODUCT_CACHE_LISTEN_EVENTS = os.environ.get('PRODUCT_CACHE_LISTEN_EVENTS', 'true').lower() == 'true'
+# Routing keys on product_events that should drop cached product data
+PRODUCT_CACHE_INVALIDATE_KEYS = os.environ.get('PRODUCT_CACHE_INVALIDATE_KEYS', 'product.#')
+# Order responses are cached in Redis so a write in one worker invalidates them
+# for all; the per-process fallback is only consistent with a single worker
+RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL', PRODUCT_CACHE_REDIS_URL or '')
+RESPONSE_CACHE_LOCAL = os.environ.get('RESPONSE_CACHE_LOCAL', 'false').lower() == 'true'
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_MAX_SIZE = int(os.environ.get('RESPONSE_CACHE_MAX_SIZE', '10000'))
+
+
+def _parse_ttls(spec):
+    ttls = {}
+    for part in spec.split(','):
+        if '=' in part:
+            field, seconds = part.split('=', 1)
+            ttls[field.strip()] = float(seconds)
+    return ttls
+
+
+class LRUCache:
+    """Thread-safe bounded LRU map with a TTL per entry and hit/miss/eviction counters."""
+
+    def __init__(self, max_size, name=None):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        # Named caches also report lookups to order_cache_lookups_total
+        self._hit_metric = CACHE_LOOKUPS.labels(name, 'hit') if name else None
+        self._miss_metric = CACHE_LOOKUPS.labels(name, 'miss') if name else None
+        self._stale_metric = CACHE_LOOKUPS.labels(name, 'stale') if name else None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                hit = False
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit = True
+        if self._hit_metric is not None:
+            (self._hit_metric if hit else self._miss_metric).inc()
+        return entry[0] if hit else None
+
+    def get_stale(self, key, max_stale):
+        """Return an entry that expired less than max_stale seconds ago, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] + max_stale <= time.monotonic():
+                return None
+            self.stale_hits += 1
+        if self._stale_metric is not None:
+            self._stale_metric.inc()
+        return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxSize': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'staleHits': self.stale_hits,
+            'evictions': self.evictions,
+        }
+
+
+class ProductCache:
+    """Product metadata keyed by product id, with a separate TTL per field.
+
+    Entries live in a per-process LRU; when a Redis URL is configured it is
+    used as a second level shared by all gunicorn workers.
+    """
+
+    def __init__(self, max_size, field_ttls, default_ttl, redis_url=None, stale_ttl=0.0):
+        self.field_ttls = field_ttls
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._local = LRUCache(max_size, name='product')
+        self._redis = None
+        self.shared_hits = 0
+        if redis_url:
+            if redis is None:
+                logger.warning("PRODUCT_CACHE_REDIS_URL is set but the redis package is not installed")
+            else:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            PRODUCT_CACHE_MAX_SIZE,
+            _parse_ttls(PRODUCT_CACHE_FIELD_TTLS),
+            PRODUCT_CACHE_DEFAULT_TTL,
+            PRODUCT_CACHE_REDIS_URL,
+            PRODUCT_CACHE_STALE_TTL,
+        )
+
+    def ttl(self, field):
+        return self.field_ttls.get(field, self.default_ttl)
+
+    def get_many(self, product_ids, fields):
+        """Return ({product_id: {field: value}}, [missing product ids])."""
+        found = {}
+        missing = []
+        for product_id in product_ids:
+            product = {}
+            for field in fields:
+                value = self._local.get((product_id, field))
+                if value is None:
+                    break
+                product[field] = value[0]
+            else:
+                found[product_id] = product
+                continue
+            missing.append(product_id)
+
+        if missing and self._redis is not None:
+            missing = self._get_shared(missing, fields, found)
+        return found, missing
+
+    def get_stale_many(self, product_ids, fields):
+        """Like get_many, but accepts local entries up to stale_ttl past expiry."""
+        found = {}
+        missing = []
+        for product_id in product_ids:
+            product = {}
+            for field in fields:
+                value = self._local.get_stale((product_id, field), self.stale_ttl)
+                if value is None:
+                    break
+                product[field] = value[0]
+            else:
+                found[product_id] = product
+                continue
+            missing.append(product_id)
+        return found, missing
+
+    def _get_shared(self, product_ids, fields, found):
+        keys = [f"product:{product_id}:{field}" for product_id in product_ids for field in fields]
+        try:
+            values = self._redis.mget(keys)
+        except redis.RedisError as e:
+            logger.warning("Shared product cache unavailable: %s", e)
+            CACHE_LOOKUPS.labels('product_shared', 'miss').inc(len(product_ids))
+            return product_ids
+
+        still_missing = []
+        for index, product_id in enumerate(product_ids):
+            raw = values[index * len(fields):(index + 1) * len(fields)]
+            if any(value is None for value in raw):
+                still_missing.append(product_id)
+                continue
+            product = {field: json.loads(value) for field, value in zip(fields, raw)}
+            self._set_local(product_id, product)
+            found[product_id] = product
+            self.shared_hits += 1
+        CACHE_LOOKUPS.labels('product_shared', 'hit').inc(len(product_ids) - len(still_missing))
+        CACHE_LOOKUPS.labels('product_shared', 'miss').inc(len(still_missing))
+        return still_missing
+
+    def set_many(self, products):
+        for product_id, product in products.items():
+            self._set_local(product_id, product)
+
+        if self._redis is not None and products:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for product_id, product in products.items():
+                    for field, value in product.items():
+                        pipe.setex(f"product:{product_id}:{field}", max(1, int(self.ttl(field))), json.dumps(value))
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning("Failed to write shared product cache: %s", e)
+
+    def _set_local(self, product_id, product):
+        for field, value in product.items():
+            # Values are boxed so a cached None is distinguishable from a miss
+            self._local.set((product_id, field), (value,), self.ttl(field))
+
+    def invalidate(self, product_ids=None):
+        """Drop the given products, or everything when product_ids is None."""
+        if product_ids is None:
+            self._local.clear()
+        else:
+            self._local.delete_where(lambda key: key[0] in product_ids)
+
+        if self._redis is not None:
+            try:
+                if product_ids is None:
+                    keys = list(self._redis.scan_iter('product:*'))
+                else:
+                    keys = [key for product_id in product_ids for key in self._redis.scan_iter(f"product:{product_id}:*")]
+                if keys:
+                    self._redis.delete(*keys)
+            except redis.RedisError as e:
+                logger.warning("Failed to invalidate shared product cache: %s", e)
+
+    def stats(self):
+        stats = self._local.stats()
+        stats['sharedHits'] = self.shared_hits
+        stats['sharedBackend'] = 'redis' if self._redis is not None else None
+        return stats
+
+
+def _product_ids_from_event(message):
+    data = message.get('data')
+    entries = data if isinstance(data, list) else [data]
+    product_ids = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            return None
+        product_id = entry.get('productId', entry.get('product_id', entry.get('id')))
+        if product_id is None:
+            return None
+        product_ids.add(int(product_id))
+    return product_ids
+
+
+class ProductEventListener:
+    """Background consumer that invalidates the product cache from product_events.
+
+    Each worker binds its own exclusive queue so every process sees every
+    event. Started lazily per process, since threads do not survive fork.
+    """
+
+    def __init__(self, cache, rabbitmq_url, routing_keys):
+        self.cache = cache
+        self.rabbitmq_url = rabbitmq_url
+        self.routing_keys = [key.strip() for key in routing_keys.split(',') if key.strip()]
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='product-cache-listener', daemon=True).start()
+
+    def _run(self):
+        backoff = 1
+        while True:
+            try:
+                connection = pika.BlockingConnection(pika.URLParameters(self.rabbitmq_url))
+                channel = connection.channel()
+                channel.exchange_declare(exchange='product_events', exchange_type='topic', durable=True)
+                queue = channel.queue_declare(queue='', exclusive=True, auto_delete=True).method.queue
+                for routing_key in self.routing_keys:
+                    channel.queue_bind(exchange='product_events', queue=queue, routing_key=routing_key)
+                # Anything cached before the subscription existed may already be stale
+                self.cache.invalidate()
+                backoff = 1
+                channel.basic_consume(queue=queue, on_message_callback=self._on_message, auto_ack=True)
+                channel.start_consuming()
+            except Exception as e:
+                logger.warning("Product cache listener disconnected: %s; retrying in %ss", e, backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def _on_message(self, channel, method, properties, body):
+        try:
+            product_ids = _product_ids_from_event(json.loads(body))
+        except (ValueError, TypeError, AttributeError):
+            product_ids = None
+        self.cache.invalidate(product_ids)
+
+
+class ResponseCache:
+    """Serialised order responses with their ETag, owner and headers.
+
+    Keys include the generation of their scope (an order, or a user's
+    listings), read before the database is queried; a write replaces the
+    generation after it commits. A read that raced the write caches under
+    the old generation, which is never looked up again, so a client sees
+    its own writes immediately and the TTL only bounds memory.
+    """
+
+    def __init__(self, ttl, max_size, redis_url=None, local=False):
+        self.ttl = ttl
+        self._redis = None
+        self._local = None
+        if redis_url:
+            if redis is None:
+                logger.warning("RESPONSE_CACHE_REDIS_URL is set but the redis package is not installed")
+            else:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+        if self._redis is None and local:
+            self._local = LRUCache(max_size, name='response')
+            self._generations = LRUCache(max_size)
+
+    @classmethod
+    def from_env(cls):
+        return cls(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_SIZE, RESPONSE_CACHE_REDIS_URL, RESPONSE_CACHE_LOCAL)
+
+    @property
+    def enabled(self):
+        return self._redis is not None or self._local is not None
+
+    def get(self, key):
+        """Return (etag, owner, body, headers) or None."""
+        if self._local is not None:
+            return self._local.get(key)
+        try:
+            entry = self._redis.hgetall(f"response:{key}")
+        except redis.RedisError as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return None
+        if not entry:
+            CACHE_LOOKUPS.labels('response_shared', 'miss').inc()
+            return None
+        CACHE_LOOKUPS.labels('response_shared', 'hit').inc()
+        return (entry[b'etag'].decode(), entry[b'owner'].decode(), entry[b'body'],
+                json.loads(entry[b'headers']))
+
+    def set(self, key, etag, owner, body, headers):
+        if self._local is not None:
+            self._local.set(key, (etag, owner, body, headers), self.ttl)
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.hset(f"response:{key}", mapping={
+                'etag': etag, 'owner': owner, 'body': body, 'headers': json.dumps(headers),
+            })
+            pipe.expire(f"response:{key}", max(1, int(self.ttl)))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Failed to write response cache: %s", e)
+
+    def generation(self, scope):
+        if self._local is not None:
+            generation = self._generations.get(scope)
+            if generation is None:
+                # A fresh value rather than 0, so entries cached before an
+                # evicted generation was replaced cannot match again
+                generation = time.time_ns()
+                self._generations.set(scope, generation, self.ttl * 2)
+            return generation
+        try:
+            generation = self._redis.get(f"response-gen:{scope}")
+            return generation.decode() if generation else 0
+        except redis.RedisError as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return None
+
+    def invalidate(self, keys=(), scopes=()):
+        """Drop the given entries and bump the generation of the given scopes."""
+        if self._local is not None:
+            for key in keys:
+                self._local.delete(key)
+            for scope in scopes:
+                self._generations.set(scope, time.time_ns(), self.ttl * 2)
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.delete(f"response:{key}")
+            for scope in scopes:
+                # A unique value rather than a counter, so a generation that
+                # expired and restarted can never match entries still cached
+                pipe.set(f"response-gen:{scope}", time.time_ns(), ex=max(1, int(self.ttl)) * 2)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Failed to invalidate response cache: %s", e)
+
+
+product_cache = ProductCache.from_env()
+response_cache = ResponseCache.from_env()
@@ -23,6 +23,11 @@ fi
 echo "Applying database migrations..."
 flask db upgrade
 
+# Run another process from the same image, e.g. `python outbox_relay.py`
+if [ "$#" -gt 0 ]; then
+  exec "$@"
+fi
+
 # Start the Flask application in production mode
 echo "Starting the application..."
-exec gunicorn app:app --bind 0.0.0.0:5000 --workers 3 --preload --access-logfile - --error-logfile -
\ No newline at end of file
+exec gunicorn app:app -c gunicorn.conf.py
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Gunicorn settings, overridable from the environment.
+
+GUNICORN_WORKER_CLASS picks the concurrency mode of each worker process:
+
+- sync:    one request at a time per worker (the old behaviour)
+- gthread: GUNICORN_THREADS requests at a time per worker
+- gevent:  up to GUNICORN_WORKER_CONNECTIONS requests per worker on
+           greenlets; sockets, the inventory HTTP calls, pika and (through
+           psycogreen) psycopg2 all yield while they wait
+
+The database pool of each worker is sized to its concurrency unless
+DB_POOL_SIZE is set explicitly.
+"""
+import os
+import shutil
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '3'))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Only for gthread: gunicorn silently turns sync into gthread when threads > 1
+threads = int(os.environ.get('GUNICORN_THREADS', '8')) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '200'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+if worker_class not in ('sync', 'gthread', 'gevent'):
+    raise RuntimeError(f"Unsupported GUNICORN_WORKER_CLASS {worker_class!r}, expected sync, gthread or gevent")
+
+# gevent patches the standard library when the worker starts, so the app
+# (threads, locks and sockets created at import) must be loaded after that
+# in each worker rather than once in the master
+preload_app = worker_class != 'gevent'
+
+if worker_class == 'gevent':
+    # Greenlets beyond the pool size wait for a connection instead of
+    # opening one each; keep the pool well below worker_connections
+    os.environ.setdefault('DB_POOL_SIZE', '20')
+    os.environ.setdefault('DB_MAX_OVERFLOW', '10')
+elif worker_class == 'gthread':
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    os.environ.setdefault('DB_MAX_OVERFLOW', '2')
+else:
+    os.environ.setdefault('DB_POOL_SIZE', '1')
+    os.environ.setdefault('DB_MAX_OVERFLOW', '1')
+
+# Workers write metrics to files here so /order-api/metrics can sum them.
+# This must be set before the app (and prometheus_client) is imported, and
+# is cleared once per master, not on every config reload.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/order-service-metrics')
+if not os.environ.get('ORDER_METRICS_DIR_READY'):
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+    os.environ['ORDER_METRICS_DIR_READY'] = '1'
+
+
+def child_exit(server, worker):
+    # Drops the live gauges of the exited worker
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # Make psycopg2 wait on the gevent hub instead of blocking the worker
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import product_cache
+from metrics import INVENTORY_CIRCUIT_OPENS, INVENTORY_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_URL = os.environ.get('INVENTORY_URL', 'http://localhost:5000/api')
+# Per-call timeouts in seconds for a single product lookup
+INVENTORY_CONNECT_TIMEOUT = float(os.environ.get('INVENTORY_CONNECT_TIMEOUT', '0.5'))
+INVENTORY_TIMEOUT = float(os.environ.get('INVENTORY_TIMEOUT', '3'))
+# Upper bound on concurrent product lookups issued for one request
+INVENTORY_MAX_CONCURRENCY = int(os.environ.get('INVENTORY_MAX_CONCURRENCY', '8'))
+# Keep-alive connections to inventory held per worker
+INVENTORY_POOL_SIZE = int(os.environ.get('INVENTORY_POOL_SIZE', '32'))
+# Consecutive failed lookups that open the circuit, and how long it stays
+# open before a single trial call is let through
+INVENTORY_BREAKER_FAILURES = int(os.environ.get('INVENTORY_BREAKER_FAILURES', '5'))
+INVENTORY_BREAKER_RESET = float(os.environ.get('INVENTORY_BREAKER_RESET', '30'))
+
+
+class ProductLookupError(Exception):
+    def __init__(self, product_id, reason, unavailable=False):
+        super().__init__(f"Product {product_id} lookup failed: {reason}")
+        self.product_id = product_id
+        self.reason = reason
+        # True when inventory itself failed, rather than the product being unknown
+        self.unavailable = unavailable
+
+
+class CircuitBreaker:
+    """Fails calls fast after repeated failures, until a trial call succeeds.
+
+    Closed: calls go through and consecutive failures are counted. Open:
+    calls are rejected without being made. After reset_timeout one trial
+    call is allowed (half-open); its outcome closes or re-opens the circuit.
+    Calls made during the trial wait up to `wait` seconds for that outcome
+    instead of being rejected, so a background refresh taking the trial, or
+    the first lookup of a request's fan-out, does not fail the others.
+    State is per process.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Condition()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+
+    def allow(self, wait=0.0):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            if self.state == self.HALF_OPEN and wait > 0:
+                self._lock.wait_for(lambda: self.state != self.HALF_OPEN, timeout=wait)
+                if self.state == self.CLOSED:
+                    return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+            self._lock.notify_all()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    logger.warning("Inventory circuit opened after %s consecutive failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                INVENTORY_CIRCUIT_OPENS.inc()
+                self._lock.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'consecutiveFailures': self.failures, 'rejected': self.rejected}
+
+
+class InventoryClient:
+    """Product lookups over one keep-alive session per worker.
+
+    Every call has a connect and read timeout and goes through a circuit
+    breaker, so an unreachable or slow inventory fails requests quickly
+    instead of holding workers for the whole timeout. The session and the
+    background refresh thread are discarded in forked children.
+    """
+
+    def __init__(self, base_url, connect_timeout, read_timeout, pool_size, breaker):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.breaker = breaker
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            INVENTORY_URL,
+            INVENTORY_CONNECT_TIMEOUT,
+            INVENTORY_TIMEOUT,
+            INVENTORY_POOL_SIZE,
+            CircuitBreaker(INVENTORY_BREAKER_FAILURES, INVENTORY_BREAKER_RESET),
+        )
+
+    def _reset(self):
+        # Never close here: in a forked child the sockets belong to the parent
+        self._lock = threading.Lock()
+        self._session = None
+        self._refresher = None
+        self._refreshing = set()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def fetch_product(self, product_id):
+        # A call made during the half-open trial waits at most as long as the trial can take
+        if not self.breaker.allow(wait=sum(self.timeout)):
+            raise ProductLookupError(product_id, "inventory circuit open", unavailable=True)
+        try:
+            response = self.session.get(f"{self.base_url}/products/inter-svc/{product_id}", timeout=self.timeout)
+            if response.status_code >= 500:
+                raise ProductLookupError(product_id, f"status {response.status_code}", unavailable=True)
+            if response.status_code == 200:
+                product = response.json()
+                if not isinstance(product, dict):
+                    raise ProductLookupError(product_id, "malformed response", unavailable=True)
+        except (requests.RequestException, ValueError, ProductLookupError):
+            self.breaker.record_failure()
+            raise
+        # A 404 still means inventory is answering
+        self.breaker.record_success()
+        if response.status_code != 200:
+            raise ProductLookupError(product_id, f"status {response.status_code}")
+        return product
+
+    def refresh_in_background(self, product_ids, fields):
+        """Re-fetch stale products off the request thread, once per product at a time."""
+        with self._lock:
+            product_ids = [product_id for product_id in product_ids if product_id not in self._refreshing]
+            if not product_ids:
+                return
+            self._refreshing.update(product_ids)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inventory-refresh')
+            refresher = self._refresher
+        refresher.submit(self._refresh, product_ids, fields)
+
+    def _refresh(self, product_ids, fields):
+        try:
+            product_cache.set_many(_pick(fetch_products(product_ids, raise_errors=False), fields))
+        except Exception as e:
+            logger.warning("Background product refresh failed: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(product_ids)
+
+    def stats(self):
+        stats = self.breaker.stats()
+        stats['refreshing'] = len(self._refreshing)
+        return stats
+
+
+inventory_client = InventoryClient.from_env()
+
+
+def fetch_product(product_id):
+    return inventory_client.fetch_product(product_id)
+
+
+def fetch_products(product_ids, raise_errors=True):
+    """Fetch each distinct product once, concurrently.
+
+    Returns a dict keyed by product id. With raise_errors, the first product
+    that could not be fetched raises ProductLookupError; otherwise failed
+    products are logged and left out of the result.
+    """
+    unique_ids = list(dict.fromkeys(product_ids))
+    if not unique_ids:
+        return {}
+
+    workers = min(INVENTORY_MAX_CONCURRENCY, len(unique_ids))
+    if workers == 1:
+        results = [_fetch_or_error(product_id) for product_id in unique_ids]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fetch_or_error, unique_ids))
+
+    products = {}
+    for product_id, result in zip(unique_ids, results):
+        if isinstance(result, ProductLookupError):
+            if raise_errors:
+                raise result
+            logger.warning(str(result))
+            continue
+        products[product_id] = result
+    return products
+
+
+def _fetch_or_error(product_id):
+    start = time.perf_counter()
+    try:
+        result = fetch_product(product_id)
+    except ProductLookupError as e:
+        result = e
+    except (requests.RequestException, ValueError) as e:
+        result = ProductLookupError(product_id, str(e), unavailable=True)
+    if not isinstance(result, ProductLookupError):
+        outcome = 'ok'
+    elif result.reason == "inventory circuit open":
+        outcome = 'rejected'
+    else:
+        outcome = 'error'
+    INVENTORY_REQUEST_DURATION.labels(outcome).observe(time.perf_counter() - start)
+    return result
+
+
+def _pick(products, fields):
+    return {
+        product_id: {field: product.get(field) for field in fields}
+        for product_id, product in products.items()
+    }
+
+
+def get_products(product_ids, fields, raise_errors=True, allow_stale=False):
+    """Return {product_id: {field: value}} for the requested fields.
+
+    Fresh fields are served from the product cache; only products with a
+    missing or expired field are fetched from inventory. With allow_stale,
+    expired fields still held in the cache are returned as they are and
+    refreshed in the background, so only never-seen products wait on
+    inventory.
+    """
+    unique_ids = list(dict.fromkeys(product_ids))
+    products, missing = product_cache.get_many(unique_ids, fields)
+    if missing and allow_stale:
+        stale, missing = product_cache.get_stale_many(missing, fields)
+        if stale:
+            products.update(stale)
+            inventory_client.refresh_in_background(list(stale), fields)
+    if missing:
+        fetched = _pick(fetch_products(missing, raise_errors=raise_errors), fields)
+        product_cache.set_many(fetched)
+        products.update(fetched)
+    return products
@@ -0,0 +1,164 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+    import json
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.environ.get('ORDER_LOG_FILE', '/var/log/order.log')
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', '256'))
+LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', '0.2'))
+# Fraction of records kept per child logger of the app logger, e.g. "items=0.1,auth=0.1"
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', 'items=0.1,auth=0.1')
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "time": self.formatTime(record, self.datefmt),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a random fraction of records below WARNING."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(logging.Handler):
+    """Hands records to the writer thread without ever waiting on it.
+
+    Records are queued unformatted; message interpolation, JSON encoding
+    and I/O all happen on the writer thread. When the queue is full the
+    record is dropped and counted instead of blocking the request.
+    """
+
+    def __init__(self, pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def emit(self, record):
+        try:
+            self.pipeline.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+
+
+class LogPipeline:
+    """Background writer that formats queued records and writes them in batches."""
+
+    def __init__(self, formatter, streams, batch_size, flush_interval, queue_size):
+        self.formatter = formatter
+        self.streams = streams
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.start()
+
+    def start(self):
+        self.queue = queue.Queue(self.queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(timeout=self.flush_interval)
+        self._drain(timeout=0)
+
+    def _drain(self, timeout):
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
+
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(f"unformattable log record from {record.name}: {record.msg!r}")
+        if self.dropped:
+            lines.append(self.formatter.format(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': 'Dropped %d log records, writer could not keep up', 'args': (self.dropped,),
+            })))
+            self.dropped = 0
+
+        text = '\n'.join(lines) + '\n'
+        for stream in self.streams:
+            try:
+                stream.write(text)
+                stream.flush()
+            except Exception:
+                pass
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+
+def _parse_rates(spec):
+    rates = {}
+    for part in spec.split(','):
+        if '=' in part:
+            name, rate = part.split('=', 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(app):
+    """Route every logger through a queue to a background JSON writer."""
+    streams = [sys.stdout]
+    if LOG_FILE:
+        try:
+            streams.append(open(LOG_FILE, 'a', buffering=1 << 16))
+        except OSError as e:
+            sys.stderr.write(f"Cannot open log file {LOG_FILE}: {e}\n")
+
+    pipeline = LogPipeline(JsonFormatter(), streams, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(pipeline)
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    app.logger.handlers = []
+    app.logger.setLevel(LOG_LEVEL)
+
+    for name, rate in _parse_rates(LOG_SAMPLE_RATES).items():
+        app.logger.getChild(name).addFilter(SamplingFilter(rate))
+
+    # The writer thread does not survive gunicorn's fork (--preload)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=pipeline.start)
+    atexit.register(pipeline.stop)
+    return pipeline
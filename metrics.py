@@ -0,0 +1,124 @@
+"""Prometheus metrics for the order service.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR is set by gunicorn.conf.py before
+the app is imported, so every worker writes its samples to shared files and
+/order-api/metrics reports the sum across workers whichever worker serves
+the scrape. Without it (flask run, scripts) the per-process registry is used.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Upper bounds in seconds, from cache-fast to request-timeout slow
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'order_http_request_duration_seconds', 'Time to build a response, per route',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    'order_db_query_duration_seconds', 'Duration of a single SQL statement',
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'order_db_queries_per_request', 'SQL statements executed by one request',
+    ['route'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'order_db_seconds_per_request', 'Time spent in SQL statements by one request',
+    ['route'], buckets=LATENCY_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    'order_db_pool_wait_seconds', 'Time spent waiting for a pooled connection',
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter('order_db_pool_timeouts_total', 'Checkouts that gave up waiting for a connection')
+DB_POOL_CHECKED_OUT = Gauge(
+    'order_db_pool_checked_out', 'Connections currently checked out',
+    multiprocess_mode='livesum',
+)
+INVENTORY_REQUEST_DURATION = Histogram(
+    'order_inventory_request_duration_seconds', 'Inventory product lookups',
+    ['outcome'], buckets=LATENCY_BUCKETS,
+)
+INVENTORY_CIRCUIT_OPENS = Counter('order_inventory_circuit_opens_total', 'Times the inventory circuit breaker opened')
+RABBITMQ_PUBLISH_DURATION = Histogram(
+    'order_rabbitmq_publish_duration_seconds', 'Publishing one batch of messages to RabbitMQ',
+    buckets=LATENCY_BUCKETS,
+)
+RABBITMQ_PUBLISH_FAILURES = Counter('order_rabbitmq_publish_failures_total', 'Batches that could not be published')
+CACHE_LOOKUPS = Counter('order_cache_lookups_total', 'Cache lookups', ['cache', 'result'])
+
+
+class Timer:
+    """Context manager that observes its duration on a histogram (or labelled child)."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+def render():
+    """Return (body, content_type) for a scrape."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app, db):
+    """Record per-route latency and per-request SQL counts and time."""
+    from flask import g, request
+    from sqlalchemy import event
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def observe_request(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_DURATION.labels(request.method, route, str(response.status_code)) \
+                .observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(g.db_queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(g.db_seconds)
+        return response
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_start'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def observe_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('query_start', time.perf_counter())
+        DB_QUERY_DURATION.observe(elapsed)
+        if g and 'db_queries' in g:
+            g.db_queries += 1
+            g.db_seconds += elapsed
+
+    @event.listens_for(engine, 'checkout')
+    def connection_checked_out(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def connection_checked_in(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
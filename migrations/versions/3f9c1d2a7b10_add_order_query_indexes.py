@@ -0,0 +1,71 @@
+"""Add indexes for the order listing query shapes
+
+Revision ID: 3f9c1d2a7b10
+Revises: 
+Create Date: 2026-10-17 09:12:44.318206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1d2a7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ACTIVE_STATUSES = "status IN ('pending', 'processing', 'confirm')"
+
+
+def drop_if_invalid(name):
+    # A cancelled or failed CONCURRENTLY build leaves an INVALID index
+    # behind, which IF NOT EXISTS would otherwise skip on every later run
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    invalid = bind.execute(
+        sa.text("SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"),
+        {'name': name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, if_exists=True, postgresql_concurrently=True)
+
+
+def upgrade():
+    # Tables are created by db.create_all() on startup, which also creates
+    # these indexes on a fresh database, hence if_not_exists. CONCURRENTLY
+    # keeps existing tables writable while the indexes are built.
+    with op.get_context().autocommit_block():
+        drop_if_invalid('ix_order_user_id_created_at_id')
+        op.create_index(
+            'ix_order_user_id_created_at_id', 'order',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+        drop_if_invalid('ix_order_created_at_id')
+        op.create_index(
+            'ix_order_created_at_id', 'order',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+        drop_if_invalid('ix_order_active_status_created_at_id')
+        op.create_index(
+            'ix_order_active_status_created_at_id', 'order',
+            ['status', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_where=sa.text(ACTIVE_STATUSES),
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+        drop_if_invalid('ix_order_item_order_id')
+        op.create_index(
+            'ix_order_item_order_id', 'order_item', ['order_id'],
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_order_item_order_id', table_name='order_item', if_exists=True, postgresql_concurrently=True)
+        op.drop_index('ix_order_active_status_created_at_id', table_name='order', if_exists=True, postgresql_concurrently=True)
+        op.drop_index('ix_order_created_at_id', table_name='order', if_exists=True, postgresql_concurrently=True)
+        op.drop_index('ix_order_user_id_created_at_id', table_name='order', if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""Add outbox_event table for the transactional outbox
+
+Revision ID: 7a4e2c9d51b3
+Revises: 3f9c1d2a7b10
+Create Date: 2026-10-17 10:02:17.552913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e2c9d51b3'
+down_revision = '3f9c1d2a7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() on startup creates the table on a fresh database
+    if sa.inspect(op.get_bind()).has_table('outbox_event'):
+        return
+    op.create_table(
+        'outbox_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('exchange', sa.String(length=100), nullable=False),
+        sa.Column('routing_key', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_outbox_event_unpublished', 'outbox_event', ['id'],
+        postgresql_where=sa.text('published_at IS NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_outbox_event_unpublished', table_name='outbox_event')
+    op.drop_table('outbox_event')
@@ -0,0 +1,34 @@
+"""Add processed_message table for idempotent status consumption
+
+Revision ID: 9b2d6e4f1a07
+Revises: 7a4e2c9d51b3
+Create Date: 2026-10-17 12:20:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2d6e4f1a07'
+down_revision = '7a4e2c9d51b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() on startup creates the table on a fresh database
+    if sa.inspect(op.get_bind()).has_table('processed_message'):
+        return
+    op.create_table(
+        'processed_message',
+        sa.Column('key', sa.String(length=200), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_processed_message_processed_at', 'processed_message', ['processed_at'])
+
+
+def downgrade():
+    op.drop_index('ix_processed_message_processed_at', table_name='processed_message')
+    op.drop_table('processed_message')
@@ -0,0 +1,38 @@
+"""Add idempotency_key table for replaying order creation
+
+Revision ID: c4f8a1e2d3b5
+Revises: 9b2d6e4f1a07
+Create Date: 2026-10-17 13:05:12.604871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f8a1e2d3b5'
+down_revision = '9b2d6e4f1a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() on startup creates the table on a fresh database
+    if sa.inspect(op.get_bind()).has_table('idempotency_key'):
+        return
+    op.create_table(
+        'idempotency_key',
+        sa.Column('key', sa.String(length=200), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('response_status', sa.Integer(), nullable=True),
+        sa.Column('response_body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_idempotency_key_expires_at', 'idempotency_key', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_idempotency_key_expires_at', table_name='idempotency_key')
+    op.drop_table('idempotency_key')
@@ -0,0 +1,67 @@
+"""Add order_archive and order_item_archive for archived orders
+
+Revision ID: e1a5c7f3b920
+Revises: d7e3b9a14c62
+Create Date: 2026-10-17 15:11:08.226493
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a5c7f3b920'
+down_revision = 'd7e3b9a14c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() on startup creates the tables on a fresh database
+    if sa.inspect(op.get_bind()).has_table('order_archive'):
+        return
+    op.create_table(
+        'order_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.String(length=50), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('payment_status', sa.String(length=20), nullable=True),
+        sa.Column('shipping_name', sa.String(length=100), nullable=False),
+        sa.Column('shipping_address1', sa.String(length=200), nullable=False),
+        sa.Column('shipping_address2', sa.String(length=200), nullable=True),
+        sa.Column('shipping_city', sa.String(length=100), nullable=False),
+        sa.Column('shipping_state', sa.String(length=100), nullable=False),
+        sa.Column('shipping_postal_code', sa.String(length=20), nullable=False),
+        sa.Column('shipping_country', sa.String(length=100), nullable=False),
+        sa.Column('tracking_number', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_archive_user_id_created_at_id', 'order_archive',
+                    ['user_id', sa.text('created_at DESC'), sa.text('id DESC')])
+    op.create_index('ix_order_archive_created_at_id', 'order_archive',
+                    [sa.text('created_at DESC'), sa.text('id DESC')])
+    op.create_table(
+        'order_item_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['order_archive.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_item_archive_order_id', 'order_item_archive', ['order_id'])
+
+
+def downgrade():
+    op.drop_index('ix_order_item_archive_order_id', table_name='order_item_archive')
+    op.drop_table('order_item_archive')
+    op.drop_index('ix_order_archive_created_at_id', table_name='order_archive')
+    op.drop_index('ix_order_archive_user_id_created_at_id', table_name='order_archive')
+    op.drop_table('order_archive')
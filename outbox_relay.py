@@ -0,0 +1,101 @@
+"""Publishes outbox events written by the order service to RabbitMQ.
+
+Run as a separate process from the same image:
+
+    python outbox_relay.py
+
+Events are read in id order and published with publisher confirms; an
+event is only marked published once the broker has confirmed it, so
+delivery is at-least-once. A failed publish stops the batch, which keeps
+events of one order in commit order. To run several relays, give each a
+distinct OUTBOX_RELAY_PARTITION ("index/count"); events are partitioned by
+order id, so each order is still relayed by exactly one process.
+"""
+import datetime
+import logging
+import os
+import time
+
+from prometheus_client import start_http_server
+
+from app import app, db, OutboxEvent, purge_expired_idempotency_keys
+from messaging import RABBITMQ_RECONNECT_BACKOFF, RABBITMQ_RECONNECT_BACKOFF_MAX, RABBITMQ_URL, EventPublisher, PublishError
+
+logger = logging.getLogger('outbox_relay')
+
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '200'))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', '0.5'))
+OUTBOX_RETENTION_HOURS = float(os.environ.get('OUTBOX_RETENTION_HOURS', '24'))
+OUTBOX_RELAY_PARTITION = os.environ.get('OUTBOX_RELAY_PARTITION', '0/1')
+# Serve this process's publish metrics for Prometheus on this port (0 disables)
+OUTBOX_METRICS_PORT = int(os.environ.get('OUTBOX_METRICS_PORT', '0'))
+
+
+def parse_partition(spec):
+    index, count = (int(part) for part in spec.split('/'))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid OUTBOX_RELAY_PARTITION {spec!r}")
+    return index, count
+
+
+def relay_batch(publisher, batch_size=OUTBOX_BATCH_SIZE, partition=(0, 1)):
+    """Publish up to batch_size pending events. Returns (published, failed)."""
+    index, count = partition
+    query = OutboxEvent.query.filter(OutboxEvent.published_at.is_(None))
+    if count > 1:
+        query = query.filter(OutboxEvent.aggregate_id % count == index)
+    events = query.order_by(OutboxEvent.id) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True) \
+        .all()
+
+    published_ids = []
+    failed = False
+    for event in events:
+        try:
+            publisher.publish_raw(event.exchange, event.routing_key, event.payload)
+        except PublishError as e:
+            logger.error("Failed to publish outbox event %s (%s): %s", event.id, event.routing_key, e)
+            failed = True
+            break
+        published_ids.append(event.id)
+
+    if published_ids:
+        OutboxEvent.query.filter(OutboxEvent.id.in_(published_ids)) \
+            .update({'published_at': datetime.datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return len(published_ids), failed
+
+
+def purge_published(retention_hours=OUTBOX_RETENTION_HOURS):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=retention_hours)
+    deleted = OutboxEvent.query.filter(OutboxEvent.published_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def run():
+    partition = parse_partition(OUTBOX_RELAY_PARTITION)
+    if OUTBOX_METRICS_PORT:
+        start_http_server(OUTBOX_METRICS_PORT)
+    publisher = EventPublisher(
+        RABBITMQ_URL, confirm=True, backoff=RABBITMQ_RECONNECT_BACKOFF, max_backoff=RABBITMQ_RECONNECT_BACKOFF_MAX,
+    )
+    logger.info("Outbox relay started for partition %s/%s", partition[0], partition[1])
+    last_purge = 0.0
+    with app.app_context():
+        while True:
+            published, failed = relay_batch(publisher, partition=partition)
+            if published:
+                logger.info("Relayed %s outbox events", published)
+            if time.monotonic() - last_purge > 3600:
+                purge_published()
+                purge_expired_idempotency_keys()
+                last_purge = time.monotonic()
+            # Keep draining while batches come back full
+            if failed or published < OUTBOX_BATCH_SIZE:
+                time.sleep(OUTBOX_POLL_INTERVAL)
+
+
+if __name__ == '__main__':
+    run()
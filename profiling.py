@@ -0,0 +1,215 @@
+"""Opt-in per-request profiling.
+
+A request is profiled when a staff token sends `X-Profile`, or when it is
+picked by PROFILE_SAMPLE_RATE. Profiled requests get a Server-Timing header
+and a log line breaking the time down by phase (inventory, db, orm_flush,
+serialize, other) plus lazy-load and SQL counts. With `X-Profile: cprofile`
+(or `pyinstrument`, when installed) and PROFILE_DIR set, a full profile of
+the request is also written there.
+
+While no request is being profiled every hook returns after checking one
+module-level counter, so the cost when disabled is nil.
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from flask import g, request
+
+try:
+    import pyinstrument
+except ImportError:  # optional, only for X-Profile: pyinstrument
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+# Fraction of all requests profiled by phase, without a dump
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+# Where cProfile/pyinstrument dumps are written; dumps are off when empty
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+
+# Requests currently being profiled in this process
+_active = 0
+_active_lock = threading.Lock()
+# One tracing profiler at a time per process
+_dump_lock = threading.Lock()
+
+
+class _Phase:
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.add(self.name, time.perf_counter() - self.start)
+
+
+class _NullPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class RequestProfile:
+    def __init__(self, dump=None):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.counts = {'lazy_loads': 0, 'flushes': 0}
+        self.dump = dump
+        self.profiler = None
+        self.flush_start = None
+        self.flush_db_start = 0.0
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def breakdown(self, db_seconds):
+        total = time.perf_counter() - self.start
+        phases = dict(self.phases)
+        if db_seconds:
+            # Statements run during a flush are already in orm_flush
+            phases['db'] = max(0.0, db_seconds - phases.get('db_in_flush', 0.0))
+        phases.pop('db_in_flush', None)
+        phases['other'] = max(0.0, total - sum(phases.values()))
+        phases['total'] = total
+        return phases
+
+
+def _current():
+    if not _active:
+        return None
+    return g.get('profile')
+
+
+def phase(name):
+    """Time a block as `name` when the current request is being profiled."""
+    profile = _current()
+    if profile is None:
+        return _NULL_PHASE
+    return _Phase(profile, name)
+
+
+def _start_dump(profile):
+    if not PROFILE_DIR or profile.dump is None or not _dump_lock.acquire(blocking=False):
+        profile.dump = None
+        return
+    if profile.dump == 'pyinstrument' and pyinstrument is not None:
+        profile.profiler = pyinstrument.Profiler()
+        profile.profiler.start()
+    else:
+        profile.dump = 'cprofile'
+        profile.profiler = cProfile.Profile()
+        profile.profiler.enable()
+
+
+def _finish_dump(profile):
+    if profile.profiler is None:
+        return None
+    try:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{request.method}-{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_')}"
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if profile.dump == 'pyinstrument':
+            profile.profiler.stop()
+            path = os.path.join(PROFILE_DIR, name + '.html')
+            with open(path, 'w') as f:
+                f.write(profile.profiler.output_html())
+        else:
+            profile.profiler.disable()
+            path = os.path.join(PROFILE_DIR, name + '.prof')
+            profile.profiler.dump_stats(path)
+        return path
+    except OSError as e:
+        logger.warning("Could not write profile dump: %s", e)
+        return None
+    finally:
+        profile.profiler = None
+        _dump_lock.release()
+
+
+def init_app(app, db, is_staff):
+    """Register the profiling hooks. `is_staff()` authorises the header."""
+    from sqlalchemy import event
+
+    @app.before_request
+    def start_profile():
+        global _active
+        requested = request.headers.get(PROFILE_HEADER)
+        if requested:
+            if not is_staff():
+                return
+            profile = RequestProfile(dump=requested.lower() if requested.lower() in ('cprofile', 'pyinstrument') else None)
+        elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            profile = RequestProfile()
+        else:
+            return
+        g.profile = profile
+        with _active_lock:
+            _active += 1
+        _start_dump(profile)
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.get('profile')
+        if profile is not None:
+            dump_path = _finish_dump(profile)
+            phases = profile.breakdown(g.get('db_seconds', 0.0))
+            response.headers['Server-Timing'] = ', '.join(
+                f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()
+            )
+            logger.info(
+                "Profile %s %s: %s lazy_loads=%s flushes=%s sql=%s%s",
+                request.method, request.path,
+                ' '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in phases.items()),
+                profile.counts['lazy_loads'], profile.counts['flushes'], g.get('db_queries', 0),
+                f" dump={dump_path}" if dump_path else '',
+            )
+        return response
+
+    @app.teardown_request
+    def release_profile(exc):
+        global _active
+        profile = g.pop('profile', None)
+        if profile is not None:
+            if profile.profiler is not None:
+                # after_request did not run (unhandled error)
+                _finish_dump(profile)
+            with _active_lock:
+                _active -= 1
+
+    @event.listens_for(db.session, 'do_orm_execute')
+    def count_lazy_loads(orm_execute_state):
+        profile = _current()
+        if profile is not None and orm_execute_state.is_relationship_load:
+            profile.counts['lazy_loads'] += 1
+
+    @event.listens_for(db.session, 'before_flush')
+    def start_flush(session, flush_context, instances):
+        profile = _current()
+        if profile is not None:
+            profile.flush_start = time.perf_counter()
+            profile.flush_db_start = g.get('db_seconds', 0.0)
+
+    @event.listens_for(db.session, 'after_flush_postexec')
+    def finish_flush(session, flush_context):
+        profile = _current()
+        if profile is not None and profile.flush_start is not None:
+            profile.add('orm_flush', time.perf_counter() - profile.flush_start)
+            profile.add('db_in_flush', g.get('db_seconds', 0.0) - profile.flush_db_start)
+            profile.counts['flushes'] += 1
+            profile.flush_start = None
@@ -0,0 +1,136 @@
+import datetime
+import decimal
+import json
+
+from flask import current_app, request
+from werkzeug.exceptions import BadRequest
+
+from profiling import phase
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+ORDER_FIELDS = (
+    'id', 'userId', 'totalAmount', 'status', 'paymentStatus', 'shippingAddress',
+    'trackingNumber', 'createdAt', 'updatedAt', 'items',
+)
+
+
+def _value(obj, name):
+    # Order and item sources may be ORM objects, result rows or plain dicts
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def serialize_item(item, images=None):
+    result = {
+        'productId': _value(item, 'product_id'),
+        'name': _value(item, 'name'),
+        'price': _value(item, 'price'),
+        'quantity': _value(item, 'quantity'),
+    }
+    if images is not None:
+        result['image'] = images.get(result['productId'], {}).get('image')
+    return result
+
+
+def serialize_order(order, items=None, fields=None, images=None):
+    """Build the API representation of an order.
+
+    `items` is omitted from the output when it is None or not among
+    `fields`; `images` adds an image to each item. Timestamps are left as
+    datetimes for the JSON encoder.
+    """
+    result = {}
+    if fields is None or 'id' in fields:
+        result['id'] = _value(order, 'id')
+    if fields is None or 'userId' in fields:
+        result['userId'] = _value(order, 'user_id')
+    if fields is None or 'totalAmount' in fields:
+        result['totalAmount'] = _value(order, 'total_amount')
+    if fields is None or 'status' in fields:
+        result['status'] = _value(order, 'status')
+    if fields is None or 'paymentStatus' in fields:
+        result['paymentStatus'] = _value(order, 'payment_status')
+    if fields is None or 'shippingAddress' in fields:
+        result['shippingAddress'] = {
+            'fullName': _value(order, 'shipping_name'),
+            'addressLine1': _value(order, 'shipping_address1'),
+            'addressLine2': _value(order, 'shipping_address2'),
+            'city': _value(order, 'shipping_city'),
+            'state': _value(order, 'shipping_state'),
+            'postalCode': _value(order, 'shipping_postal_code'),
+            'country': _value(order, 'shipping_country'),
+        }
+    if fields is None or 'trackingNumber' in fields:
+        result['trackingNumber'] = _value(order, 'tracking_number')
+    if fields is None or 'createdAt' in fields:
+        result['createdAt'] = _value(order, 'created_at')
+    if fields is None or 'updatedAt' in fields:
+        result['updatedAt'] = _value(order, 'updated_at')
+    if items is not None and (fields is None or 'items' in fields):
+        result['items'] = [serialize_item(item, images) for item in items]
+    return result
+
+
+def requested_fields():
+    """Parse the ?fields= query parameter into a set, or None for all fields."""
+    value = request.args.get('fields')
+    if not value:
+        return None
+    fields = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = fields.difference(ORDER_FIELDS)
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    # Money is exact in the database and in arithmetic; the API keeps
+    # sending it as a JSON number
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=json_default)
+    return json.dumps(payload, default=json_default, separators=(',', ':'))
+
+
+def json_response(payload, status=200):
+    with phase('serialize'):
+        body = dumps(payload)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _dumps_bytes(payload):
+    body = dumps(payload)
+    return body if isinstance(body, bytes) else body.encode()
+
+
+def stream_json(chunks, ndjson=False):
+    """Encode an iterable of payload lists as NDJSON or as one JSON array.
+
+    Each chunk is encoded and yielded as soon as it arrives, so only one
+    chunk is held in memory at a time.
+    """
+    if ndjson:
+        for chunk in chunks:
+            if chunk:
+                yield b''.join(_dumps_bytes(payload) + b'\n' for payload in chunk)
+        return
+
+    yield b'['
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        body = b','.join(_dumps_bytes(payload) for payload in chunk)
+        yield body if first else b',' + body
+        first = False
+    yield b']'
@@ -0,0 +1,228 @@
+"""Applies payment and shipping status updates published to RabbitMQ.
+
+Run as a separate process from the same image:
+
+    python status_consumer.py
+
+Messages look like {"eventId": ..., "data": {"orderId": 1, "status": ...,
+"paymentStatus": ..., "trackingNumber": ...}}. Up to STATUS_CONSUMER_PREFETCH
+unacked deliveries are buffered and applied in one transaction with the same
+rules as the internal status endpoints, then acked together. Each message's
+idempotency key (AMQP message_id, eventId, or a hash of the body) is stored
+in the same transaction, so a redelivered message is acked without being
+applied twice. Messages whose values do not fit the order columns are
+rejected without requeue. When the database is unreachable the batch is
+nacked and redelivered; any other database error retries the batch one
+message at a time and rejects, without requeue, the messages that still
+fail. A rejected message is dead-lettered when the queue has a
+dead-letter exchange (set one with a RabbitMQ policy).
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+
+import pika
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+
+from app import app, db, ProcessedMessage, apply_status_updates, invalidate_order_responses, status_update_error
+from messaging import RABBITMQ_URL
+
+logger = logging.getLogger('status_consumer')
+
+STATUS_CONSUMER_QUEUE = os.environ.get('STATUS_CONSUMER_QUEUE', 'order-service.status-updates')
+# exchange:routing_key pairs the queue is bound to
+STATUS_CONSUMER_BINDINGS = os.environ.get(
+    'STATUS_CONSUMER_BINDINGS', 'payment_events:payment.result.#,shipping_events:shipment.result.#',
+)
+# Unacked deliveries the broker sends ahead; also the largest batch applied at once
+STATUS_CONSUMER_PREFETCH = int(os.environ.get('STATUS_CONSUMER_PREFETCH', '200'))
+# How long to wait for more messages before applying a partial batch
+STATUS_CONSUMER_BATCH_WAIT = float(os.environ.get('STATUS_CONSUMER_BATCH_WAIT', '0.05'))
+STATUS_CONSUMER_RETENTION_HOURS = float(os.environ.get('STATUS_CONSUMER_RETENTION_HOURS', '72'))
+
+
+def parse_bindings(spec):
+    bindings = []
+    for part in spec.split(','):
+        if ':' in part:
+            exchange, routing_key = part.split(':', 1)
+            bindings.append((exchange.strip(), routing_key.strip()))
+    return bindings
+
+
+def parse_message(properties, body):
+    """Return (idempotency_key, update) or raise ValueError for an unusable message."""
+    message = json.loads(body)
+    if not isinstance(message, dict):
+        raise ValueError('message is not an object')
+    data = message.get('data', message)
+    if not isinstance(data, dict):
+        raise ValueError('data is not an object')
+
+    order_id = data.get('orderId', data.get('order_id'))
+    if isinstance(order_id, str) and order_id.isdigit():
+        order_id = int(order_id)
+    if not isinstance(order_id, int):
+        raise ValueError('missing orderId')
+
+    update = {'orderId': order_id}
+    for field, alias in (('status', 'status'), ('paymentStatus', 'payment_status'), ('trackingNumber', 'tracking_number')):
+        if field in data or alias in data:
+            update[field] = data.get(field, data.get(alias))
+    if len(update) == 1:
+        raise ValueError('no status, paymentStatus or trackingNumber')
+    error = status_update_error(update)
+    if error:
+        raise ValueError(error)
+
+    key = (properties.message_id if properties is not None else None) \
+        or message.get('eventId') or message.get('idempotencyKey') \
+        or hashlib.sha256(body).hexdigest()
+    return str(key)[:200], update
+
+
+def apply_batch(messages):
+    """Apply parsed (key, update) messages in one transaction.
+
+    Returns (applied, duplicates, rejected). Raises on database errors,
+    after rolling back.
+    """
+    rejected = 0
+    changed = {}
+    try:
+        keys = [key for key, _ in messages]
+        seen = {row.key for row in ProcessedMessage.query.with_entities(ProcessedMessage.key)
+                .filter(ProcessedMessage.key.in_(keys))}
+        fresh = []
+        for key, update in messages:
+            if key in seen:
+                continue
+            seen.add(key)
+            fresh.append((key, update))
+
+        if fresh:
+            results, changed = apply_status_updates([update for _, update in fresh])
+            for (key, update), result in zip(fresh, results):
+                if not result['success']:
+                    rejected += 1
+                    logger.warning("Status update %s for order %s not applied: %s", key, update['orderId'], result['error'])
+            db.session.execute(db.insert(ProcessedMessage), [{'key': key} for key, _ in fresh])
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    invalidate_order_responses(list(changed), set(changed.values()))
+    return len(fresh) - rejected, len(messages) - len(fresh), rejected
+
+
+def purge_processed(retention_hours=STATUS_CONSUMER_RETENTION_HOURS):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=retention_hours)
+    deleted = ProcessedMessage.query.filter(ProcessedMessage.processed_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+class StatusConsumer:
+    def __init__(self, url=RABBITMQ_URL, queue=STATUS_CONSUMER_QUEUE, bindings=STATUS_CONSUMER_BINDINGS,
+                 prefetch=STATUS_CONSUMER_PREFETCH, batch_wait=STATUS_CONSUMER_BATCH_WAIT):
+        self.url = url
+        self.queue = queue
+        self.bindings = parse_bindings(bindings)
+        self.prefetch = prefetch
+        self.batch_wait = batch_wait
+        self.processed = 0
+        self.last_purge = 0.0
+
+    def connect(self):
+        connection = pika.BlockingConnection(pika.URLParameters(self.url))
+        channel = connection.channel()
+        channel.queue_declare(queue=self.queue, durable=True)
+        for exchange, routing_key in self.bindings:
+            channel.exchange_declare(exchange=exchange, exchange_type='topic', durable=True)
+            channel.queue_bind(exchange=exchange, queue=self.queue, routing_key=routing_key)
+        channel.basic_qos(prefetch_count=self.prefetch)
+        return connection, channel
+
+    def consume(self, channel, max_messages=None):
+        """Consume until the channel closes, or until max_messages have been settled."""
+        batch = []
+        settled = 0
+        for method, properties, body in channel.consume(self.queue, inactivity_timeout=self.batch_wait):
+            if method is not None:
+                try:
+                    batch.append((method.delivery_tag, parse_message(properties, body)))
+                except (ValueError, TypeError) as e:
+                    # Redelivering would fail the same way
+                    logger.error("Dropping unparseable status message: %s", e)
+                    channel.basic_reject(method.delivery_tag, requeue=False)
+                    settled += 1
+                if len(batch) < self.prefetch:
+                    continue
+            if batch:
+                self.flush(channel, batch)
+                settled += len(batch)
+                batch = []
+            if max_messages is not None and settled >= max_messages:
+                channel.cancel()
+                return
+
+    def flush(self, channel, batch):
+        last_tag = batch[-1][0]
+        try:
+            applied, duplicates, rejected = apply_batch([message for _, message in batch])
+        except (OperationalError, InterfaceError) as e:
+            logger.error("Failed to apply %s status updates, requeueing: %s", len(batch), e)
+            channel.basic_nack(last_tag, multiple=True, requeue=True)
+            time.sleep(1)
+            return
+        except SQLAlchemyError as e:
+            logger.error("Failed to apply %s status updates, retrying one at a time: %s", len(batch), e)
+            self.flush_each(channel, batch)
+            return
+        channel.basic_ack(last_tag, multiple=True)
+        self.processed += len(batch)
+        logger.info("Applied %s status updates (%s duplicates, %s rejected)", applied, duplicates, rejected)
+        self.purge_if_due()
+
+    def flush_each(self, channel, batch):
+        """Apply a failed batch message by message so one bad update cannot block the rest."""
+        for index, (tag, (key, update)) in enumerate(batch):
+            try:
+                apply_batch([(key, update)])
+            except (OperationalError, InterfaceError) as e:
+                logger.error("Failed to apply %s status updates, requeueing: %s", len(batch) - index, e)
+                channel.basic_nack(batch[-1][0], multiple=True, requeue=True)
+                time.sleep(1)
+                return
+            except SQLAlchemyError as e:
+                logger.error("Rejecting status update %s for order %s: %s", key, update['orderId'], e)
+                channel.basic_reject(tag, requeue=False)
+            else:
+                channel.basic_ack(tag)
+            self.processed += 1
+
+    def purge_if_due(self):
+        if time.monotonic() - self.last_purge > 3600:
+            purge_processed()
+            self.last_purge = time.monotonic()
+
+    def run(self):
+        backoff = 1
+        with app.app_context():
+            while True:
+                try:
+                    connection, channel = self.connect()
+                    backoff = 1
+                    logger.info("Status consumer listening on %s", self.queue)
+                    self.consume(channel)
+                except pika.exceptions.AMQPError as e:
+                    logger.warning("Status consumer disconnected: %s; retrying in %ss", e, backoff)
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 60)
+
+
+if __name__ == '__main__':
+    StatusConsumer().run()